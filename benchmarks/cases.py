@@ -0,0 +1,91 @@
+import json
+
+from django_menus.menu import HtmlMenu, MenuItem, DividerItem, MenuItemBadge
+from django_menus.templatetags.django_menu_tags import show_menu
+from django_menus import DUMMY_MENU_ID
+
+from benchmarks.environment import make_request
+
+CASES = {}
+
+
+def case(name):
+    def register(function):
+        CASES[name] = function
+        return function
+    return register
+
+
+def link_type_case(name, url, link_type, **kwargs):
+    @case(f'menu_item_{name}')
+    def build():
+        return MenuItem(url, 'Item', link_type, **kwargs).href()
+
+
+link_type_case('url_name', 'view1', MenuItem.URL_NAME)
+link_type_case('ajax_get_url_name', 'content2', MenuItem.AJAX_GET_URL_NAME)
+link_type_case('ajax_button', 'test_button', MenuItem.AJAX_BUTTON)
+link_type_case('ajax_command', {'function': 'message', 'text': 'hello'}, MenuItem.AJAX_COMMAND)
+
+
+def sample_items():
+    return ['view1', 'view2', 'view3', ('view4', 'View 4'), ('int_path', 'Int path', {'url_args': [1]}),
+            MenuItem('view2', 'Badge', badge=MenuItemBadge('bench-badge', text='3', css_class='warning')),
+            ("alert('x')", 'Javascript', MenuItem.JAVASCRIPT), ('view1', 'Tooltip', {'tooltip': 'tip'})]
+
+
+def template_case(template):
+    @case(f'render_{template}')
+    def render():
+        return HtmlMenu(make_request(), template).add_items(*sample_items()).render()
+
+    @case(f'native_{template}')
+    def render_native():
+        return HtmlMenu(make_request(), template, native_render=True).add_items(*sample_items()).render()
+
+
+for menu_template in HtmlMenu.templates:
+    template_case(menu_template)
+
+
+@case('render_nested_dropdowns')
+def nested_dropdowns():
+    return HtmlMenu(make_request(), 'button_group').add_items(
+        'view1',
+        MenuItem(menu_display='All', dropdown=('view1', 'view2', DividerItem(), 'view3', 'view4')),
+        MenuItem(menu_display='Nested', dropdown=(
+            'view1', MenuItem(menu_display='Inner', dropdown=('view2', 'view3')), 'view4')),
+        MenuItem(menu_display='More', no_hover=True, dropdown=('view1', 'view2', 'view3')),
+    ).render()
+
+
+def row_menu(compile_rows):
+    return HtmlMenu(make_request(), 'button_group', compile_rows=compile_rows).add_items(
+        (f"alert('{DUMMY_MENU_ID}')", 'Row', MenuItem.JAVASCRIPT),
+        MenuItem(menu_display='', css_classes='btn-secondary',
+                 dropdown=((f"alert('{DUMMY_MENU_ID}')", 'Edit', MenuItem.JAVASCRIPT), 'view1')))
+
+
+@case('show_menu_100_rows')
+def show_menu_rows():
+    menu = row_menu(False)
+    return [show_menu(menu, pk=pk) for pk in range(100)]
+
+
+@case('show_menu_100_rows_compiled')
+def show_menu_rows_compiled():
+    menu = row_menu(True)
+    return [show_menu(menu, pk=pk) for pk in range(100)]
+
+
+@case('tab_response')
+def tab_response():
+    from menu_examples.views import AjaxTabExample2
+    return AjaxTabExample2.as_view()(make_request('/ajax-tab-example/tab2/', ajax=True))
+
+
+@case('timer_menu')
+def timer_menu():
+    from menu_examples.views import View1
+    request = make_request('/view1/', ajax=True, method='post', data=json.dumps({'timer': 'menu'}))
+    return View1.as_view()(request)
@@ -0,0 +1,78 @@
+import tracemalloc
+from contextlib import contextmanager
+
+from django.template import base as template_base
+
+from django_menus.menu import menu_items
+
+
+class Counters:
+
+    def __init__(self):
+        self.reverse = 0
+        self.resolve = 0
+        self.reverse_lookups = 0
+        self.resolve_lookups = 0
+        self.templates = 0
+
+    @contextmanager
+    def patch(self):
+        reverse = menu_items.reverse
+        resolve = menu_items.resolve
+        cached_reverse = menu_items.cached_reverse
+        cached_resolve = menu_items.cached_resolve
+        template_render = template_base.Template._render
+
+        def counted_reverse(*args, **kwargs):
+            self.reverse += 1
+            return reverse(*args, **kwargs)
+
+        def counted_resolve(*args, **kwargs):
+            self.resolve += 1
+            return resolve(*args, **kwargs)
+
+        def counted_cached_reverse(*args, **kwargs):
+            self.reverse_lookups += 1
+            return cached_reverse(*args, **kwargs)
+
+        def counted_cached_resolve(*args, **kwargs):
+            self.resolve_lookups += 1
+            return cached_resolve(*args, **kwargs)
+
+        def counted_render(template, context):
+            self.templates += 1
+            return template_render(template, context)
+
+        menu_items.reverse = counted_reverse
+        menu_items.resolve = counted_resolve
+        menu_items.cached_reverse = counted_cached_reverse
+        menu_items.cached_resolve = counted_cached_resolve
+        template_base.Template._render = counted_render
+        try:
+            yield self
+        finally:
+            menu_items.reverse = reverse
+            menu_items.resolve = resolve
+            menu_items.cached_reverse = cached_reverse
+            menu_items.cached_resolve = cached_resolve
+            template_base.Template._render = template_render
+
+
+def measure_calls(function):
+    counters = Counters()
+    with counters.patch():
+        function()
+    return {'reverse_calls': counters.reverse, 'resolve_calls': counters.resolve,
+            'reverse_lookups': counters.reverse_lookups, 'resolve_lookups': counters.resolve_lookups,
+            'template_renders': counters.templates}
+
+
+def measure_allocations(function):
+    tracemalloc.start()
+    try:
+        start, _peak = tracemalloc.get_traced_memory()
+        function()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'peak_bytes': peak - start, 'retained_bytes': current - start}
@@ -0,0 +1,29 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup():
+    for path in (ROOT, os.path.join(ROOT, 'django_examples')):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_examples.settings')
+    import django
+    django.setup()
+    from django.conf import settings
+    settings.ALLOWED_HOSTS = ['*']
+
+
+def make_request(path='/view1/', ajax=False, method='get', data=None):
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from django.urls import resolve
+    extra = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'} if ajax else {}
+    if method == 'post':
+        request = RequestFactory().post(path, data, content_type='application/json', **extra)
+    else:
+        request = RequestFactory().get(path, **extra)
+    request.resolver_match = resolve(path)
+    request.user = AnonymousUser()
+    return request
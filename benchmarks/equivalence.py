@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+
+from benchmarks.environment import setup, make_request
+
+setup()
+
+from django.conf import settings  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from django_menus.menu import (HtmlMenu, MenuItem, MenuItemBadge, DividerItem, HtmlMenuItem,  # noqa: E402
+                               AjaxButtonMenuItem)
+from django_menus.menu.menu_items import HeaderItem  # noqa: E402
+from django_menus.menu.native import native_renderer  # noqa: E402
+
+
+def sample_items():
+    return [
+        'view1',
+        ('view2', 'View <2> & "quoted"'),
+        ('view3', 'Disabled', {'disabled': True}),
+        MenuItem('view4', 'Icon', font_awesome='fas fa-pen', css_classes=['btn-success', 'extra']),
+        MenuItem('view1', 'Tooltip', tooltip='tip "text"', attributes={'data-x': 'y'}),
+        MenuItem('view2', 'Badge', badge=MenuItemBadge('eq-badge', text='3', css_class='warning')),
+        MenuItem('view2', 'Empty badge', badge=MenuItemBadge('eq-empty')),
+        ('content2', 'Ajax', MenuItem.AJAX_GET_URL_NAME),
+        ("alert('x')", 'Javascript', MenuItem.JAVASCRIPT),
+        ('https://example.com', 'Target', {'link_type': MenuItem.HREF, 'target': '_blank'}),
+        AjaxButtonMenuItem('test_button', 'Ajax button'),
+        MenuItem(menu_display='Dropdown', dropdown=('view1', DividerItem(), HeaderItem('Header'), 'view2')),
+        MenuItem(menu_display='No caret', show_caret=False, no_hover=True, dropdown=('view3',)),
+        MenuItem(menu_display='Nested', dropdown=('view1', MenuItem(menu_display='Inner', dropdown=('view2',)))),
+        MenuItem('view1', 'Custom template', template='django_menus/single_button.html'),
+        HtmlMenuItem('<span class="html-item">Html</span>'),
+        HtmlMenuItem('plain text'),
+        DividerItem(),
+    ]
+
+
+def menus():
+    for template in HtmlMenu.templates:
+        yield template, {}
+        yield f'{template} (active)', {'template': template, 'active': 'view2'}
+    yield 'base (right)', {'template': 'base', 'alignment': 'right'}
+    yield 'dropdown (no hover)', {'template': 'dropdown', 'no_hover': True, 'placement': 'top'}
+    yield 'base (delegated)', {'template': 'base', 'delegated': True}
+    yield 'dropdown (delegated)', {'template': 'dropdown', 'no_hover': True, 'delegated': True}
+
+
+def render(native, template='base', active=None, **kwargs):
+    menu = HtmlMenu(make_request('/view2/'), template, native_render=native, deterministic_id=True, **kwargs)
+    menu.add_items(*sample_items())
+    if active:
+        menu.active = active
+    return str(menu.render())
+
+
+def button(native):
+    menu = HtmlMenu(make_request(), native_render=native)
+    return str(MenuItem('view1', 'Single', badge=MenuItemBadge(text='1'), menu=menu).render())
+
+
+def check(name, template_html, native_html):
+    ok = template_html == native_html
+    print(f'{"ok      " if ok else "MISMATCH"} {name}')
+    if not ok:
+        print(f'  template: {template_html!r}\n  native:   {native_html!r}')
+    return ok
+
+
+def run():
+    results = []
+    for name, kwargs in menus():
+        kwargs = kwargs or {'template': name}
+        results.append(check(name, render(False, **kwargs), render(True, **kwargs)))
+    results.append(check('single_button', button(False), button(True)))
+
+    with tempfile.TemporaryDirectory() as template_dir:
+        os.makedirs(os.path.join(template_dir, 'django_menus'))
+        with open(os.path.join(template_dir, 'django_menus', 'tab_menu.html'), 'w') as f:
+            f.write('<ul class="overridden">{% for value in menu.visible_items %}{{ value.name }}{% endfor %}</ul>')
+        templates = [dict(settings.TEMPLATES[0], DIRS=[template_dir] + list(settings.TEMPLATES[0]['DIRS']))]
+        with override_settings(TEMPLATES=templates):
+            results.append(check('overridden template falls back', str(native_renderer('django_menus/tab_menu.html')),
+                                 'None'))
+            results.append(check('overridden template output', render(False, 'tabs'), render(True, 'tabs')))
+    print(f'{results.count(True)}/{len(results)} equivalent')
+    return all(results)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run() else 1)
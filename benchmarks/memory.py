@@ -0,0 +1,91 @@
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+from benchmarks.environment import setup, make_request
+
+setup()
+
+from django_menus.menu import HtmlMenu, MenuItem, MenuItemBadge  # noqa: E402
+
+
+def plain_items(count):
+    return [('view1', f'Item {i}') for i in range(count)]
+
+
+def styled_items(count):
+    return [MenuItem('view2', 'Edit', font_awesome='fas fa-pen', css_classes=['btn-sm', 'btn-secondary'])
+            for _i in range(count)]
+
+
+def resolved_items(count):
+    return [('view1', 'view2', 'view3', 'view4')[i % 4] for i in range(count)]
+
+
+def badge_items(count):
+    return [MenuItem('view3', 'Badge', badge=MenuItemBadge(f'memory-badge-{i}', text=str(i), css_class='warning'))
+            for i in range(count)]
+
+
+def dropdown_items(count):
+    return [MenuItem(menu_display='More', dropdown=('view1', 'view2')) for _i in range(count)]
+
+
+SHAPES = {
+    'plain': plain_items,
+    'styled': styled_items,
+    'resolved': resolved_items,
+    'badges': badge_items,
+    'dropdowns': dropdown_items,
+}
+
+
+def bytes_per_item(shape, count):
+    request = make_request()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start, _peak = tracemalloc.get_traced_memory()
+        menu = HtmlMenu(request, 'button_group').add_items(*SHAPES[shape](count)).prepare()
+        gc.collect()
+        current, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(menu.menu_items) == count
+    return (current - start) / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.memory', description='django-menus item memory')
+    parser.add_argument('shapes', nargs='*', help='item shapes to measure (default: all)')
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='compare results with a saved JSON file')
+    args = parser.parse_args(argv)
+    names = args.shapes if args.shapes else list(SHAPES)
+    unknown = [n for n in names if n not in SHAPES]
+    if unknown:
+        parser.error(f'unknown shapes: {", ".join(unknown)}')
+
+    for name in names:
+        bytes_per_item(name, 100)
+    results = {name: round(bytes_per_item(name, args.items)) for name in names}
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    for name, result in results.items():
+        line = f'{name:12} {result:8} B/item'
+        if name in baseline:
+            line += f'  (was {baseline[name]} B/item, {result - baseline[name]:+})'
+        print(line)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'items': args.items, 'results': results}, f, indent=2,
+                      sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import json
+import sys
+import time
+
+from benchmarks import environment
+
+
+def time_case(function, iterations, repeats, cold):
+    from django_menus.menu.menu_items import clear_url_cache
+    best = None
+    for _repeat in range(repeats):
+        elapsed = 0
+        for _iteration in range(iterations):
+            if cold:
+                clear_url_cache()
+            start = time.perf_counter()
+            function()
+            elapsed += time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / iterations
+
+
+def run_case(name, function, iterations, repeats, cold):
+    from benchmarks.counters import measure_allocations, measure_calls
+    from django_menus.menu.menu_items import clear_url_cache
+    function()
+    result = {'seconds': time_case(function, iterations, repeats, cold)}
+    if cold:
+        clear_url_cache()
+    result.update(measure_calls(function))
+    if cold:
+        clear_url_cache()
+    result.update(measure_allocations(function))
+    return result
+
+
+def compare(results, baseline):
+    lines = []
+    for name, result in results.items():
+        if name not in baseline:
+            lines.append(f'{name:40} new')
+            continue
+        ratio = result['seconds'] / baseline[name]['seconds'] if baseline[name]['seconds'] else 0
+        changes = [f'time x{ratio:.2f}']
+        for key in ('reverse_calls', 'resolve_calls', 'reverse_lookups', 'resolve_lookups', 'template_renders',
+                    'peak_bytes'):
+            if result.get(key) != baseline[name].get(key):
+                changes.append(f'{key} {baseline[name].get(key)} -> {result.get(key)}')
+        lines.append(f'{name:40} ' + ', '.join(changes))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='django-menus benchmarks')
+    parser.add_argument('cases', nargs='*', help='case names to run (default: all)')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--cold', action='store_true', help='clear the url cache before every iteration')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='compare results with a saved JSON baseline')
+    parser.add_argument('--list', action='store_true', help='list case names')
+    args = parser.parse_args(argv)
+
+    environment.setup()
+    from benchmarks.cases import CASES
+
+    if args.list:
+        print('\n'.join(CASES))
+        return
+    names = args.cases if args.cases else list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f'unknown cases: {", ".join(unknown)}')
+
+    results = {}
+    for name in names:
+        results[name] = run_case(name, CASES[name], args.iterations, args.repeats, args.cold)
+        r = results[name]
+        print(f"{name:32} {r['seconds'] * 1e6:10.1f} us  "
+              f"reverse {r['reverse_calls']:3}/{r['reverse_lookups']:<3}  "
+              f"resolve {r['resolve_calls']:3}/{r['resolve_lookups']:<3}  "
+              f"templates {r['template_renders']:4}  peak {r['peak_bytes']:8} B", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(results, json.load(f)['results']))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'cold': args.cold, 'results': results}, f, indent=2,
+                      sort_keys=True)
@@ -13,4 +13,6 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_examples.settings')
 
-application = get_asgi_application()
+from django_menus.asgi import badge_stream_application  # noqa: E402
+
+application = badge_stream_application(get_asgi_application())
@@ -10,21 +10,23 @@ from show_src_code.modals import BaseSourceCodeModal
 from show_src_code.view_mixins import DemoViewMixin
 
 from django_menus.menu import DividerItem, AjaxMenuTemplateView, HtmlMenu, AjaxMenuTabs, MenuItemBadge, \
-    MenuItemDisplay
+    MenuItemDisplay, MenuDefinition
 from django_menus.menu import MenuItem
 from django_menus.menu.context_menu import ContextMenuMixin
 from django_menus.menu.menu_items import HeaderItem
 
 
+main_menu_definition = MenuDefinition(
+    'view1',
+    ('ajaxtab', 'Ajax Tabs', ),
+    ('modal_examples', 'Modal Examples'),
+    ('context_examples', 'Context Examples'),
+    ('ajax_dropdown_menu_examples', 'Ajax-DropDown Menu Examples'),
+)
+
+
 def setup_main_menu(request):
-    menu = HtmlMenu(request).add_items(
-        'view1',
-        ('ajaxtab', 'Ajax Tabs', ),
-        ('modal_examples', 'Modal Examples'),
-        ('context_examples', 'Context Examples'),
-        ('ajax_dropdown_menu_examples', 'Ajax-DropDown Menu Examples'),
-    )
-    return menu
+    return main_menu_definition.bind(request)
 
 
 class MainMenu(DemoViewMixin, AjaxMenuTemplateView):
@@ -69,6 +71,8 @@ class AjaxTabExample(MainMenu, AjaxMenuTabs):
 class AjaxTabExample2(AjaxTabExample):
 
     tab_template = 'menu_examples/tab_template2.html'
+    tab_cache_max_age = 30
+    stream_tabs = True
 
 
 class View1(MainMenu):
@@ -154,6 +158,7 @@ class View1(MainMenu):
             MenuItem(menu_display='Divider', dropdown=('view1', 'view2', DividerItem(), 'view3')),
             MenuItem(menu_display='No Caret', show_caret=False, dropdown=('view1', 'view2', 'view3')),
             MenuItem(menu_display='No hover', no_hover=True, dropdown=('view1', 'view2', 'view3')),
+            MenuItem(menu_display='Deferred', defer_dropdown=True, dropdown=('view1', 'view2', 'view3')),
         )
 
     def setup_menu(self):
@@ -174,7 +179,7 @@ class View1(MainMenu):
             'view3')
         self.dropdowns()
 
-        self.add_menu('loop_buttons', 'button_group').add_items(
+        self.add_menu('loop_buttons', 'button_group', compile_rows=True, delegated=True).add_items(
             (f"alert('{DUMMY_MENU_ID}')", 'Test loop id', MenuItem.JAVASCRIPT),
             MenuItem(menu_display='', placement='bottom-end', css_classes='btn-secondary',
                      dropdown=((f"alert('{DUMMY_MENU_ID}')", 'Test loop id', MenuItem.JAVASCRIPT),
@@ -0,0 +1,72 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from django.core import signing
+
+from django_menus.menu.badges import badge_broker, badge_stream_channels
+
+
+class BadgeEventStream:
+
+    keepalive = 15
+
+    def __init__(self, broker=None, keepalive=None):
+        self.broker = broker
+        if keepalive is not None:
+            self.keepalive = keepalive
+
+    def get_channels(self, scope):
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token', [''])[0]
+        try:
+            return badge_stream_channels(token)
+        except signing.BadSignature:
+            return None
+
+    async def __call__(self, scope, receive, send):
+        channels = self.get_channels(scope)
+        if channels is None:
+            await send({'type': 'http.response.start', 'status': 403, 'headers': [(b'content-type', b'text/plain')]})
+            await send({'type': 'http.response.body', 'body': b'Forbidden'})
+            return
+        broker = self.broker if self.broker is not None else badge_broker()
+        queue = broker.subscribe(channels)
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'),
+                                (b'x-accel-buffering', b'no')]})
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        try:
+            while not disconnected.done():
+                message = asyncio.ensure_future(queue.get())
+                await asyncio.wait({message, disconnected}, timeout=self.keepalive,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if message.done():
+                    commands = [message.result()]
+                    while not queue.empty():
+                        commands.append(queue.get_nowait())
+                    body = f'data: {json.dumps(commands)}\n\n'
+                else:
+                    message.cancel()
+                    body = ': keepalive\n\n'
+                if not disconnected.done():
+                    await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': True})
+        finally:
+            broker.unsubscribe(queue)
+            disconnected.cancel()
+
+    @staticmethod
+    async def wait_for_disconnect(receive):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+
+
+def badge_stream_application(application, path='/django-menus/badges/', stream=None):
+    stream = stream if stream is not None else BadgeEventStream()
+
+    async def router(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == path:
+            return await stream(scope, receive, send)
+        return await application(scope, receive, send)
+    return router
@@ -1,4 +1,4 @@
 from .menu_items import (MenuItem, MenuItemDisplay, BaseMenuItem, DividerItem , MenuItemBadge, HtmlMenuItem,
                          AjaxButtonMenuItem)
-from .menu import MenuMixin, HtmlMenu, AjaxMenuTemplateView
+from .menu import MenuMixin, HtmlMenu, MenuDefinition, AjaxMenuTemplateView, invalidate_menu_cache
 from .tabs import AjaxMenuTabs
\ No newline at end of file
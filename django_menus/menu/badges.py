@@ -0,0 +1,336 @@
+import asyncio
+import copy
+import inspect
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.db import connections
+from django.utils.crypto import salted_hmac
+from django.utils.module_loading import import_string
+from django.views.generic import View
+
+from django_menus.menu.menu_items import MenuItemBadge
+
+
+badge_stream_salt = 'django_menus.badge_stream'
+badge_ids_salt = 'django_menus.badge_ids'
+badge_hash_pattern = re.compile(r'data-menu-badge-hash="([^"]*)"')
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def badge_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'DJANGO_MENUS_BADGE_WORKERS', 0),
+                                               thread_name_prefix='django_menus_badge')
+    return _executor
+
+
+def badge_cache():
+    return caches[getattr(settings, 'DJANGO_MENUS_CACHE', 'default')]
+
+
+def store_badge(key, badge):
+    cache = badge_cache()
+    cache.set(key, (badge.text, badge.css_class, time.time()), badge.cache_timeout + (badge.stale_while_revalidate or 0))
+    cache.set(key + ':last', (badge.text, badge.css_class), None)
+
+
+def refresh_badge(key, badge):
+    try:
+        result = copy.copy(badge)
+        result.evaluate()
+        store_badge(key, result)
+    finally:
+        badge_cache().delete(key + ':refresh')
+        connections.close_all()
+
+
+def cached_badges(badges, request=None):
+    keys = {b: b.cache_key(request) for b in badges}
+    keys = {b: k for b, k in keys.items() if k}
+    if not keys:
+        return badges, {}
+    cache = badge_cache()
+    cached = cache.get_many(list(keys.values()))
+    now = time.time()
+    pending = []
+    for badge in badges:
+        key = keys.get(badge)
+        if key not in cached:
+            pending.append(badge)
+            continue
+        badge.text, badge.css_class, computed_at = cached[key]
+        badge.evaluated = True
+        if now - computed_at >= badge.cache_timeout and cache.add(key + ':refresh', True, badge.cache_timeout):
+            threading.Thread(target=refresh_badge, args=(key, badge), daemon=True).start()
+    return pending, keys
+
+
+def badge_timeout(badge):
+    return badge.timeout if badge.timeout is not None else getattr(settings, 'DJANGO_MENUS_BADGE_TIMEOUT', None)
+
+
+def apply_badge_result(badge, result, key=None):
+    if result is None:
+        last_value = badge_cache().get(key + ':last') if key else None
+        if last_value is not None:
+            badge.text, badge.css_class = last_value
+    else:
+        badge.text, badge.css_class = result.text, result.css_class
+    badge.evaluated = True
+
+
+def run_sync_badge(badge, result):
+    try:
+        badge.format_function(result)
+    finally:
+        connections.close_all()
+    return result
+
+
+async def run_async_badges(badges):
+    async def run(badge):
+        result = copy.copy(badge)
+        try:
+            await asyncio.wait_for(badge.format_function(result), badge_timeout(badge))
+        except asyncio.TimeoutError:
+            return None
+        return result
+    return await asyncio.gather(*[run(b) for b in badges])
+
+
+def evaluate_badges(badges, request=None):
+    badges = [b for b in badges if getattr(b, 'format_function', None) and not b.evaluated]
+    pending, keys = cached_badges(badges, request)
+    async_badges = [b for b in pending if asyncio.iscoroutinefunction(b.format_function)]
+    sync_badges = [b for b in pending if b not in async_badges]
+    futures = []
+    if getattr(settings, 'DJANGO_MENUS_BADGE_WORKERS', 0) and len(sync_badges) > 1:
+        futures = [(b, badge_executor().submit(run_sync_badge, b, copy.copy(b))) for b in sync_badges]
+    start = time.monotonic()
+    results = []
+    if async_badges:
+        results += zip(async_badges, async_to_sync(run_async_badges)(async_badges))
+    for badge, future in futures:
+        timeout = badge_timeout(badge)
+        try:
+            results.append((badge, future.result(None if timeout is None
+                                                 else max(0, timeout - (time.monotonic() - start)))))
+        except TimeoutError:
+            results.append((badge, None))
+    for badge in sync_badges:
+        if badge in keys and not futures:
+            result = copy.copy(badge)
+            result.evaluate()
+            results.append((badge, result))
+    for badge, result in results:
+        apply_badge_result(badge, result, keys.get(badge))
+        if result is not None and badge in keys:
+            store_badge(keys[badge], badge)
+    return [b for b in badges if b.evaluated]
+
+
+def reset_badges(badges):
+    for badge in badges:
+        badge.evaluated = False
+
+
+def rendered_badge_hash(html):
+    match = badge_hash_pattern.search(str(html))
+    return match.group(1) if match else ''
+
+
+class RegisteredBadge:
+
+    def __init__(self, badge):
+        self.id = badge.id
+        self.text = badge.text
+        self.css_class = badge.css_class
+        self.timeout = badge.timeout
+        self.cache_policy = {'cache_timeout': badge.cache_timeout, 'cache_scope': badge.cache_scope,
+                             'stale_while_revalidate': badge.stale_while_revalidate}
+        self.view_method = inspect.ismethod(badge.format_function) and isinstance(badge.format_function.__self__,
+                                                                                  View)
+        self.format_function = badge.format_function.__func__ if self.view_method else badge.format_function
+        self.shared = self.view_method or (inspect.isfunction(self.format_function) and
+                                           self.format_function.__closure__ is None)
+
+    def badge(self, view=None):
+        format_function = self.format_function
+        if self.view_method:
+            format_function = format_function.__get__(view)
+        return MenuItemBadge(self.id, format_function, self.text, self.css_class, self.timeout, **self.cache_policy)
+
+
+class BadgeRegistry:
+
+    def __init__(self):
+        self.badges = {}
+        self.populated = False
+        self._lock = threading.Lock()
+
+    def register(self, badges):
+        with self._lock:
+            for badge in badges:
+                if badge.id and badge.format_function:
+                    registered = RegisteredBadge(badge)
+                    if registered.shared:
+                        self.badges[badge.id] = registered
+            self.populated = True
+
+    def has_badges(self, badge_ids=None):
+        if not self.populated:
+            return False
+        return badge_ids is None or all(b in self.badges for b in badge_ids)
+
+    def badge_ajax(self, view=None, badge_ids=()):
+        badges = [self.badges[b].badge(view) for b in badge_ids]
+        evaluate_badges(badges, getattr(view, 'request', None))
+        return [b.ajax_command() for b in badges]
+
+
+registries = {}
+registries_lock = threading.Lock()
+
+
+def badge_registry(view_class):
+    registry = registries.get(view_class)
+    if registry is None:
+        with registries_lock:
+            registry = registries.setdefault(view_class, BadgeRegistry())
+    return registry
+
+
+def badge_channel(badge_id, user=None, session_key=None):
+    if user is not None:
+        return f'{badge_id}:user-{user.pk}'
+    if session_key is not None:
+        return f'{badge_id}:session-{salted_hmac(badge_stream_salt, session_key).hexdigest()[:16]}'
+    return f'{badge_id}:global'
+
+
+def badge_channels(badge_id, request=None):
+    channels = [badge_channel(badge_id)]
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        channels.append(badge_channel(badge_id, user=user))
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        channels.append(badge_channel(badge_id, session_key=session.session_key))
+    return channels
+
+
+def badge_requester(request=None):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user-{user.pk}'
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        return f'session-{salted_hmac(badge_ids_salt, session.session_key).hexdigest()[:16]}'
+    return 'anonymous'
+
+
+def badge_ids_token(badge_ids, request=None):
+    return signing.dumps([badge_requester(request), sorted(set(badge_ids))], salt=badge_ids_salt)
+
+
+def token_badge_ids(token, request=None):
+    try:
+        requester, badge_ids = signing.loads(token, salt=badge_ids_salt,
+                                             max_age=getattr(settings, 'DJANGO_MENUS_BADGE_STREAM_MAX_AGE', 86400))
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    return set(badge_ids) if requester == badge_requester(request) else None
+
+
+def badge_stream_token(badge_ids, request=None):
+    return signing.dumps([c for b in badge_ids for c in badge_channels(b, request)], salt=badge_stream_salt)
+
+
+def badge_stream_channels(token):
+    return signing.loads(token, salt=badge_stream_salt,
+                         max_age=getattr(settings, 'DJANGO_MENUS_BADGE_STREAM_MAX_AGE', 86400))
+
+
+class BadgeBroker:
+
+    def __init__(self):
+        self.values = OrderedDict()
+        self.subscribers = {}
+        self.max_values = getattr(settings, 'DJANGO_MENUS_BADGE_BROKER_VALUES', 10000)
+        self.value_ttl = getattr(settings, 'DJANGO_MENUS_BADGE_BROKER_VALUE_TTL', 300)
+        self._lock = threading.Lock()
+
+    def evict(self, now):
+        stale = []
+        for channel, (_command, published) in self.values.items():
+            if now - published < self.value_ttl:
+                break
+            if channel not in self.subscribers:
+                stale.append(channel)
+        for channel in stale:
+            del self.values[channel]
+        while len(self.values) > self.max_values:
+            self.values.popitem(last=False)
+
+    def publish(self, command, channel):
+        now = time.monotonic()
+        with self._lock:
+            if channel in self.values and self.values[channel][0]['html'] == command['html']:
+                self.values[channel] = (command, now)
+                self.values.move_to_end(channel)
+                return False
+            self.values[channel] = (command, now)
+            self.values.move_to_end(channel)
+            self.evict(now)
+            subscribers = list(self.subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, command)
+        return True
+
+    def subscribe(self, channels):
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue()
+        with self._lock:
+            for channel in channels:
+                self.subscribers.setdefault(channel, set()).add((loop, queue))
+                if channel in self.values:
+                    queue.put_nowait(self.values[channel][0])
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            for channel, subscribers in list(self.subscribers.items()):
+                subscribers -= {s for s in subscribers if s[1] is queue}
+                if not subscribers:
+                    del self.subscribers[channel]
+            self.evict(time.monotonic())
+
+
+_broker = None
+
+
+def badge_broker():
+    global _broker
+    if _broker is None:
+        with registries_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'DJANGO_MENUS_BADGE_BROKER',
+                                                'django_menus.menu.badges.BadgeBroker'))()
+    return _broker
+
+
+def publish_badge(badge_id, text=None, css_class=None, user=None, session_key=None):
+    command = MenuItemBadge(badge_id, text=text, css_class=css_class).ajax_command()
+    return badge_broker().publish(command, badge_channel(badge_id, user, session_key))
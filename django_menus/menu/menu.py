@@ -1,18 +1,56 @@
+import copy
+import hashlib
 import json
+import threading
+from collections import ChainMap
 
 from ajax_helpers.mixins import AjaxHelpers
-from ajax_helpers.utils import random_string
+from ajax_helpers.utils import ajax_command, random_string
 from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponseNotModified
 from django.template.loader import render_to_string
+from django.urls import get_urlconf
 from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
 from django.views.generic import TemplateView, View
 
 from django_menus.menu import MenuItem, BaseMenuItem
+from django_menus import DUMMY_MENU_ID, DUMMY_MENU_SLUG
+from django_menus.menu.badges import (badge_ids_token, badge_registry, badge_stream_token, evaluate_badges,
+                                      rendered_badge_hash, reset_badges, token_badge_ids)
+from django_menus.menu.menu_items import (BadgePlaceholder, button_defaults_index, normalise_button_defaults,
+                                          stable_value)
+from django_menus.menu.native import native_renderer
+from django_menus.menu.row_menu import RowMenuTemplate
+
+
+def menu_cache():
+    return caches[getattr(settings, 'DJANGO_MENUS_CACHE', 'default')]
+
+
+def generation_key(cache_key=None):
+    return f'django_menus:menu:{cache_key}:generation' if cache_key else 'django_menus:menu:generation'
+
+
+def invalidate_menu_cache(cache_key=None):
+    cache = menu_cache()
+    key = generation_key(cache_key)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
 
 
 class HtmlMenu:
 
     key_press_template = 'django_menus/menu_key_press.html'
+    deferred_template = 'django_menus/deferred_dropdown.html'
+
+    bulk_permission_methods = {
+        'view_permission': 'view_permissions_bulk',
+        'menu_permissions': 'menu_permissions_bulk',
+    }
 
     templates = {
         'base': 'django_menus/main_menu.html',
@@ -25,11 +63,13 @@ class HtmlMenu:
     }
 
     def __init__(self, request=None, template='base', menu_id=None, default_link_type=MenuItem.URL_NAME,
-                 placement=None, no_hover=False, button_defaults=None, alignment=None, compare_full_path=False):
+                 placement=None, no_hover=False, button_defaults=None, alignment=None, compare_full_path=False,
+                 cache_key=None, cache_timeout=None, deterministic_id=None, compile_rows=False, native_render=None,
+                 delegated=None):
         self.menu_items = []
-        self.button_defaults = getattr(settings, 'DJANGO_MENUS_BUTTON_DEFAULTS', {})
-        if button_defaults is not None:
-            self.button_defaults.update(button_defaults)
+        self.button_defaults = button_defaults_index()
+        if button_defaults:
+            self.button_defaults = ChainMap(normalise_button_defaults(button_defaults), self.button_defaults)
 
         self.template = self.templates.get(template, template)
         self.request = request
@@ -41,8 +81,27 @@ class HtmlMenu:
         self.id = None
         self.compare_full_path = compare_full_path
         self.default_link_type = default_link_type
+        self.cache_key = cache_key
+        self.cache_timeout = cache_timeout
+        if deterministic_id is None:
+            deterministic_id = getattr(settings, 'DJANGO_MENUS_DETERMINISTIC_IDS', False)
+        self.deterministic_id = deterministic_id
+        self.position = None
+        self.rendering_items = None
+        self.compile_rows = compile_rows
+        if native_render is None:
+            native_render = getattr(settings, 'DJANGO_MENUS_NATIVE_RENDER', False)
+        self.native_render = native_render
+        if delegated is None:
+            delegated = getattr(settings, 'DJANGO_MENUS_DELEGATED_DROPDOWNS', False)
+        self.delegated = delegated
+        self.row_templates = {}
+        self.path = None
+        self.deferred_items = None
 
     def visible_items(self):
+        if self.rendering_items is not None:
+            return self.rendering_items
         return [i for i in self.menu_items if i.visible]
 
     def add_item(self, url_name=None, text=None,  link_type=None, **kwargs):
@@ -65,28 +124,214 @@ class HtmlMenu:
                 self.add_item(a)
         return self
 
+    def load_deferred(self):
+        if self.deferred_items is not None:
+            items, self.deferred_items = self.deferred_items, None
+            self.add_items(*[i.bind(self) if isinstance(i, BaseMenuItem) else i for i in items])
+        return self
+
+    def prepare(self):
+        for i in self.menu_items:
+            i.prepare()
+        return self
+
+    def bind(self, request):
+        menu = copy.copy(self)
+        menu.request = request
+        menu.id = None
+        menu.rendering_items = None
+        menu.row_templates = {}
+        menu.menu_items = [i.bind(menu) for i in self.menu_items]
+        return menu
+
     def badge_ajax(self):
-        return [{'function': 'html', 'selector': '#' + i.badge.id, 'html': i.badge.badge_html()}
-                for i in self.menu_items if i.has_badge]
+        badges = [i.badge for i in self.menu_items if i.has_badge]
+        evaluated = evaluate_badges(badges, self.request)
+        try:
+            return [b.ajax_command() for b in badges]
+        finally:
+            reset_badges(evaluated)
+
+    def contents_key(self, strict=False):
+        items = self.menu_items + list(self.deferred_items or ())
+        return [self.template, self.placement, self.no_hover, self.alignment] + [
+            i.definition_key(strict) if isinstance(i, BaseMenuItem) else stable_value(i, strict) for i in items]
+
+    def definition_key(self, strict=False):
+        return [self.position, self.delegated] + self.contents_key(strict)
+
+    def stable_id(self):
+        return 'm' + hashlib.md5(json.dumps(self.definition_key()).encode()).hexdigest()[:10]
+
+    def all_items(self):
+        for i in self.menu_items:
+            yield i
+            dropdown = getattr(i, 'dropdown', None)
+            if dropdown:
+                yield from dropdown.all_items()
+
+    def badge_items(self):
+        return [i for i in self.all_items() if i.has_badge]
+
+    def check_permissions(self):
+        bulk = {}
+        for i in self.all_items():
+            if i.visible and not i.permission_checked:
+                view_class, permission_method = i.permission_source(self.request)
+                bulk_method = self.bulk_permission_methods.get(permission_method)
+                if bulk_method and hasattr(view_class, bulk_method):
+                    bulk.setdefault((view_class, bulk_method), []).append(i)
+        for (view_class, bulk_method), items in bulk.items():
+            results = getattr(view_class, bulk_method)(self.request, items)
+            for i, visible in zip(items, results):
+                i.visible = visible
+                i.permission_checked = True
+
+    def permission_fingerprint(self):
+        user = getattr(self.request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return 'anonymous'
+        if user.is_superuser:
+            return 'superuser'
+        return hashlib.md5(','.join(sorted(user.get_all_permissions())).encode()).hexdigest()
+
+    def cache_vary(self):
+        if self.active:
+            active = self.active
+        elif self.compare_full_path:
+            active = self.request.get_full_path()
+        else:
+            active = self.request.path
+        definition = json.dumps([self.definition_key(strict=True), [i.visible for i in self.all_items()]])
+        return [hashlib.md5(definition.encode()).hexdigest(), active, self.permission_fingerprint(), get_language()]
+
+    def fragment_cache_key(self):
+        vary = hashlib.md5('|'.join(str(v) for v in self.cache_vary()).encode()).hexdigest()
+        return f'django_menus:menu:{self.cache_key}:{vary}'
+
+    def cacheable(self):
+        try:
+            self.definition_key(strict=True)
+        except TypeError:
+            return False
+        return True
+
+    def cached_render(self):
+        cache = menu_cache()
+        key = self.fragment_cache_key()
+        generation_keys = [generation_key(self.cache_key), generation_key()]
+        cached = cache.get_many([key] + generation_keys)
+        generation = [cached.get(k, 0) for k in generation_keys]
+        badge_items = self.badge_items()
+        if key in cached and cached[key][0] == generation:
+            html, menu_ids = cached[key][1:]
+            for menu, menu_id in zip(self.id_menus(), menu_ids):
+                menu.id = menu_id
+        else:
+            badges = [i._badge for i in badge_items]
+            for c, i in enumerate(badge_items):
+                i._badge = BadgePlaceholder(f'{self.cache_key}-{c}')
+            try:
+                html = self.render_menu()
+            finally:
+                for i, badge in zip(badge_items, badges):
+                    i._badge = badge
+            timeout = self.cache_timeout
+            if timeout is None:
+                timeout = getattr(settings, 'DJANGO_MENUS_CACHE_TIMEOUT', 300)
+            cache.set(key, (generation, str(html), [m.id for m in self.id_menus()]), timeout)
+        for c, i in enumerate(badge_items):
+            html = html.replace(str(BadgePlaceholder(f'{self.cache_key}-{c}')), str(i.badge))
+        return mark_safe(html)
+
+    @staticmethod
+    def row_token(name):
+        if name == 'pk':
+            return str(DUMMY_MENU_ID)
+        elif name == 'slug':
+            return str(DUMMY_MENU_SLUG)
+        return str(name)
+
+    def row_template(self, *names):
+        key = tuple(sorted(names))
+        if key not in self.row_templates:
+            html = str(self.render())
+            self.row_templates[key] = RowMenuTemplate(html, {self.row_token(n): n for n in names},
+                                                      self.rendered_ids(html))
+        return self.row_templates[key]
+
+    def id_menus(self):
+        return [self] + [i.dropdown for i in self.all_items() if getattr(i, 'dropdown', None)]
+
+    def rendered_ids(self, html):
+        return [m.id for m in self.id_menus() if m.id and m.id in html]
+
+    def render_row(self, **kwargs):
+        return self.row_template(*kwargs).render(**kwargs)
+
+    def row_menu_id(self):
+        return f'row-menu-{self.position or self.stable_id()}'
+
+    def client_row_template(self):
+        template = self.row_template('pk', 'slug')
+        values = {'pk': '{pk}', 'slug': '{slug}'}
+        for c, menu_id in enumerate(template.ids):
+            values[('id', c)] = menu_id + '{row}'
+        return template.fill(values)
 
     def render(self):
+        evaluated = evaluate_badges([i._badge for i in self.badge_items()], self.request)
+        try:
+            if self.cache_key and self.request is not None and self.cacheable():
+                return self.cached_render()
+            return self.render_menu()
+        finally:
+            reset_badges(evaluated)
+
+    def assign_id(self):
         if self.fixed_id:
             self.id = self.fixed_id
+        elif self.deterministic_id:
+            self.id = self.stable_id()
         else:
             self.id = random_string()
+
+    def render_deferred(self):
+        self.assign_id()
+        return render_to_string(self.deferred_template, context={
+            'menu': self, 'url': self.request.get_full_path() if self.request else ''
+        })
+
+    def render_menu(self):
+        self.assign_id()
+        self.check_permissions()
         extra_menus = ''
         key_dict = {}
         no_items = True
-        for i in self.menu_items:
+        for index, i in enumerate(self.menu_items):
             if not i.test_visible(self.request):
                 continue
             if hasattr(i, 'dropdown') and i.dropdown:
                 # noinspection PyUnresolvedReferences
                 i.dropdown.request = self.request
-                extra_menu = i.dropdown.render()
-                if not extra_menu:
-                    i.visible = False
-                extra_menus += extra_menu
+                i.dropdown.position = f'{self.id}-{index}'
+                if self.deterministic_id:
+                    i.dropdown.deterministic_id = True
+                if self.native_render:
+                    i.dropdown.native_render = True
+                if self.delegated:
+                    i.dropdown.delegated = True
+                path = self.path or self.position
+                if i.dropdown.deferred_items is not None and path:
+                    i.dropdown.path = f'{path}.{index}'
+                    extra_menus += i.dropdown.render_deferred()
+                else:
+                    if path:
+                        i.dropdown.path = f'{path}.{index}'
+                    extra_menu = i.dropdown.load_deferred().render()
+                    if not extra_menu:
+                        i.visible = False
+                    extra_menus += extra_menu
             if getattr(i, 'key', None):
                 key_list = [i.key] if isinstance(i.key, str) else i.key
                 for key in key_list:
@@ -102,9 +347,51 @@ class HtmlMenu:
             no_items = False
         if no_items:
             return ''
-        keyboard = render_to_string(self.key_press_template,
-                                    context={'key_dict': json.dumps(key_dict)}) if key_dict else ''
-        return mark_safe(render_to_string(self.template, context={'menu': self}) + extra_menus + keyboard)
+        key_json = json.dumps(key_dict).replace('<', '\\u003c')
+        keyboard = render_to_string(self.key_press_template, context={'key_dict': key_json}) if key_dict else ''
+        self.rendering_items = [i for i in self.menu_items if i.visible]
+        for i in self.rendering_items:
+            i.freeze()
+        try:
+            renderer = native_renderer(self.template) if self.native_render else None
+            html = renderer(self) if renderer else render_to_string(self.template, context={'menu': self})
+        finally:
+            for i in self.rendering_items:
+                i.thaw()
+            self.rendering_items = None
+        return mark_safe(html + extra_menus + keyboard)
+
+
+class MenuDefinition:
+
+    def __init__(self, *items, template='base', **kwargs):
+        self.items = items
+        self.template = template
+        self.kwargs = kwargs
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def compile(self):
+        key = (get_urlconf(), get_language())
+        menu = self._compiled.get(key)
+        if menu is None:
+            with self._lock:
+                menu = self._compiled.get(key)
+                if menu is None:
+                    menu = HtmlMenu(template=self.template, **self.kwargs)
+                    menu.add_items(*[i.bind(menu) if isinstance(i, BaseMenuItem) else i for i in self.items])
+                    menu.prepare()
+                    self._compiled[key] = menu
+        return menu
+
+    def clear(self):
+        with self._lock:
+            self._compiled = {}
+        if self.kwargs.get('cache_key'):
+            invalidate_menu_cache(self.kwargs['cache_key'])
+
+    def bind(self, request):
+        return self.compile().bind(request)
 
 
 class MenuMixin:
@@ -115,10 +402,14 @@ class MenuMixin:
             self.menus[menu_name] = HtmlMenu(request, menu_type, **kwargs)
         else:
             self.menus[menu_name] = HtmlMenu(request, **kwargs)
+        self.menus[menu_name].position = menu_name
         return self.menus[menu_name]
 
     def get_context_data(self, **kwargs):
         self.setup_menu()
+        for menu_name, menu in self.menus.items():
+            if menu.position is None:
+                menu.position = menu_name
         super_context = getattr(super(), 'get_context_data')
         if super_context and callable(super_context):
             context = super_context(**kwargs)
@@ -145,15 +436,95 @@ class MenuTemplateView(MenuMixin, TemplateView):
 
 class AjaxMenuTemplateView(AjaxHelpers, MenuTemplateView):
 
-    def timer_menu(self, **_kwargs):
+    badge_stream_url = None
+
+    def get_page_commands(self):
+        commands = super().get_page_commands()
+        badge_ids = [i.badge.id for m in self.menus.values() for i in m.badge_items() if i.badge.id]
+        if badge_ids:
+            commands.append(ajax_command('menu_badge_ids', token=badge_ids_token(badge_ids, self.request)))
+            if self.badge_stream_url:
+                commands.append(ajax_command('badge_stream', url=self.badge_stream_url,
+                                             token=badge_stream_token(badge_ids, self.request)))
+        return commands
+
+    def badge_registry(self):
+        return badge_registry(self.__class__)
+
+    def register_badges(self):
+        self.badge_registry().register(i.badge for m in self.menus.values() for i in m.badge_items())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        self.register_badges()
+        return context
+
+    def badge_commands(self, badge_ids=None, badge_token=None):
+        registry = self.badge_registry()
+        if badge_ids is not None and badge_token and registry.has_badges(badge_ids):
+            allowed = token_badge_ids(badge_token, self.request)
+            if allowed is not None and allowed.issuperset(badge_ids):
+                return registry.badge_ajax(self, badge_ids)
         self.setup_menu()
-        for m in self.menus.values():
-            self.response_commands += m.badge_ajax()
+        self.register_badges()
+        return [c for m in self.menus.values() for c in m.badge_ajax()
+                if badge_ids is None or c['selector'][1:] in badge_ids]
+
+    def badge_response(self, commands):
+        try:
+            client_hashes = json.loads(self.request.headers.get('X-Menu-Badges', ''))
+        except ValueError:
+            client_hashes = None
+        if not isinstance(client_hashes, dict):
+            self.response_commands += commands
+            return self.command_response()
+        changed = [c for c in commands if client_hashes.get(c['selector'][1:]) != rendered_badge_hash(c['html'])]
+        if not changed:
+            return HttpResponseNotModified()
+        self.response_commands += changed
         return self.command_response()
 
+    def timer_menu(self, badge_ids=None, badge_token=None, **_kwargs):
+        return self.badge_response(self.badge_commands(badge_ids, badge_token))
+
+    def deferred_menu(self, path):
+        self.setup_menu()
+        names = path.split('.')
+        menu = self.menus.get(names[0])
+        try:
+            for depth, index in enumerate(names[1:], 2):
+                parent = menu.load_deferred()
+                parent.request = parent.request or self.request
+                parent.check_permissions()
+                item = parent.menu_items[int(index)]
+                if not item.test_visible(self.request):
+                    return None
+                menu = item.dropdown
+                menu.request = self.request
+                menu.native_render = menu.native_render or parent.native_render
+                menu.deterministic_id = menu.deterministic_id or parent.deterministic_id
+                menu.path = '.'.join(names[:depth])
+        except (AttributeError, IndexError, ValueError):
+            return None
+        return menu
+
+    def ajax_deferred_dropdown(self, *, path, menu_id, **_kwargs):
+        menu = self.deferred_menu(path)
+        if menu is None or menu is self.menus.get(path):
+            return self.command_response()
+        menu.load_deferred()
+        menu.fixed_id = menu_id
+        menu.delegated = True
+        return self.command_response('deferred_dropdown', menu_id=menu_id, html=menu.render())
+
 
 class AjaxMenuDropDownItem(MenuItem):
+    __slots__ = ('value', 'dropdown_view_name')
+
     def __init__(self, *args, value=None, dropdown_view_name='dropdown_menu', menu_display='', template='django_menus/ajax_dropdown.html', **kwargs):
         self.value = value
         self.dropdown_view_name = dropdown_view_name
         super().__init__(*args, menu_display=menu_display, template=template, **kwargs)
+
+    def definition_key(self, strict=False):
+        return super().definition_key(strict) + [stable_value(self.value, strict), self.dropdown_view_name]
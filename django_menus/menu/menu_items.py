@@ -1,39 +1,231 @@
+import asyncio
+import copy
+import hashlib
 import json
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import MappingProxyType
 from urllib.parse import urlparse, urlencode
 
 from ajax_helpers.templatetags.ajax_helpers import button_javascript
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.template.loader import render_to_string
-from django.urls import reverse, resolve, Resolver404
+from django.urls import reverse, resolve, Resolver404, get_urlconf, get_script_prefix
+from django.utils.functional import Promise
 from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+
+class UrlCache:
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        return getattr(settings, 'DJANGO_MENUS_URL_CACHE_SIZE', 1024)
+
+    def get(self, key, function):
+        try:
+            hash(key)
+        except TypeError:
+            return function()
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return self._data[key]
+        value = function()
+        with self._lock:
+            self.misses += 1
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data), 'maxsize': self.maxsize}
+
+
+reverse_cache = UrlCache()
+resolve_cache = UrlCache()
+
+
+def cached_reverse(viewname, args=None, kwargs=None):
+    urlconf = get_urlconf()
+    args = tuple(args) if args else ()
+    kwargs = kwargs if kwargs else {}
+    key = (urlconf, get_script_prefix(), get_language(), viewname, args, tuple(sorted(kwargs.items())))
+    return reverse_cache.get(key, lambda: reverse(viewname, urlconf=urlconf, args=args, kwargs=kwargs))
+
+
+def cached_resolve(path):
+    urlconf = get_urlconf()
+
+    def _resolve():
+        try:
+            return resolve(path, urlconf)
+        except Resolver404:
+            return None
+
+    match = resolve_cache.get((urlconf, get_language(), path), _resolve)
+    if match is None:
+        raise Resolver404({'path': path})
+    return match
+
+
+def url_cache_info():
+    return {'reverse': reverse_cache.info(), 'resolve': resolve_cache.info()}
+
+
+def clear_url_cache():
+    reverse_cache.clear()
+    resolve_cache.clear()
+
+
+_button_defaults = None
+
+
+def normalise_button_defaults(button_defaults):
+    return {k: shared_display(v if isinstance(v, MenuItemDisplay) else MenuItemDisplay(v))
+            for k, v in button_defaults.items()}
+
+
+def button_defaults_index():
+    global _button_defaults
+    if _button_defaults is None:
+        _button_defaults = MappingProxyType(
+            normalise_button_defaults(getattr(settings, 'DJANGO_MENUS_BUTTON_DEFAULTS', {})))
+    return _button_defaults
+
+
+@receiver(setting_changed)
+def url_settings_changed(setting, **_kwargs):
+    global _button_defaults
+    if setting in ('ROOT_URLCONF', 'DJANGO_MENUS_URL_CACHE_SIZE'):
+        clear_url_cache()
+    elif setting == 'DJANGO_MENUS_BUTTON_DEFAULTS':
+        _button_defaults = None
+
+
+def badge_hash(html):
+    return hashlib.md5(str(html).encode()).hexdigest()[:8]
 
 
 class MenuItemBadge:
 
-    def __init__(self, badge_id=None, format_function=None, text=None, css_class=None):
+    __slots__ = ('id', 'text', 'css_class', 'format_function', 'timeout', 'cache_timeout', 'cache_scope',
+                 'stale_while_revalidate', 'evaluated')
+
+    def __init__(self, badge_id=None, format_function=None, text=None, css_class=None, timeout=None,
+                 cache_timeout=None, cache_scope='global', stale_while_revalidate=None):
         self.id = badge_id
         self.text = text
         self.css_class = css_class
         self.format_function = format_function
+        self.timeout = timeout
+        self.cache_timeout = cache_timeout
+        self.cache_scope = cache_scope
+        self.stale_while_revalidate = stale_while_revalidate
+        self.evaluated = False
+
+    def cache_key(self, request=None):
+        if not self.id or not self.cache_timeout:
+            return None
+        if self.cache_scope == 'global':
+            scope = 'global'
+        elif request is None:
+            return None
+        elif self.cache_scope == 'user':
+            user = getattr(request, 'user', None)
+            if user is None or not user.is_authenticated:
+                return None
+            scope = f'user-{user.pk}'
+        elif self.cache_scope == 'session':
+            if not request.session.session_key:
+                return None
+            scope = f'session-{request.session.session_key}'
+        else:
+            raise ValueError(f'Unknown badge cache scope {self.cache_scope}')
+        return f'django_menus:badge:{self.id}:{scope}'
 
-    def badge_html(self):
-        if self.format_function:
+    def evaluate(self):
+        if asyncio.iscoroutinefunction(self.format_function):
+            async_to_sync(self.format_function)(self)
+        else:
             self.format_function(self)
+
+    def badge_html(self):
+        if self.format_function and not self.evaluated:
+            self.evaluate()
         if self.text:
-            return mark_safe(f'&nbsp;<sup><span class="badge badge-pill badge-{self.css_class}">{self.text}</span></sup>')
+            html = f'<span class="badge badge-pill badge-{self.css_class}">{self.text}</span>'
+            return mark_safe(f'&nbsp;<sup data-menu-badge-hash="{badge_hash(html)}">{html}</sup>')
         return ''
 
+    def ajax_command(self):
+        return {'function': 'html', 'selector': '#' + self.id, 'html': self.badge_html()}
+
     def __str__(self):
         if self.id:
-            return mark_safe(f'<span id="{self.id}">{self.badge_html()}</span>')
+            return mark_safe(f'<span id="{self.id}" data-menu-badge>{self.badge_html()}</span>')
         else:
             return mark_safe(self.badge_html())
 
 
+def stable_value(value, strict=False):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Promise):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return [stable_value(v, strict) for v in value]
+    if isinstance(value, Mapping):
+        return [[str(k), stable_value(v, strict)] for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))]
+    if strict:
+        raise TypeError(f'{value.__class__.__name__} values cannot be part of a menu definition')
+    return value.__class__.__name__
+
+
+def check_definition(item, strict):
+    if strict and 'definition_key' not in type(item).__dict__:
+        raise TypeError(f'{item.__class__.__name__} does not define definition_key')
+
+
+class BadgePlaceholder:
+
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __str__(self):
+        return mark_safe(f'<!--django-menus-badge-{self.index}-->')
+
+
 class BaseMenuItem:
 
+    __slots__ = ('disabled', 'visible', 'permission_checked', 'snapshot', '_badge', '_menu')
+
     def __init__(self, disabled=False, visible=True, menu=None, badge=None, **kwargs):
         self.disabled = disabled
         self.visible = visible
+        self.permission_checked = False
+        self.snapshot = None
         self._badge = badge
         self._menu = menu
 
@@ -45,6 +237,13 @@ class BaseMenuItem:
     def menu(self, menu):
         self._menu = menu
 
+    def bind(self, menu):
+        item = copy.copy(self)
+        item._menu = menu
+        if item._badge is not None:
+            item._badge = copy.copy(item._badge)
+        return item
+
     @property
     def badge(self):
         if self._badge is None:
@@ -59,9 +258,26 @@ class BaseMenuItem:
     def test_visible(self, request):
         return True
 
+    def permission_source(self, request):
+        return None, None
+
+    def prepare(self):
+        return
+
+    def freeze(self):
+        return
+
+    def thaw(self):
+        self.snapshot = None
+
+    def definition_key(self, strict=False):
+        check_definition(self, strict)
+        return [self.__class__.__name__, self.disabled, self._badge is not None]
+
 
 class HtmlMenuItem(BaseMenuItem):
 
+    __slots__ = ('html',)
     default_render = False
 
     def __init__(self, html=None, **kwargs):
@@ -71,17 +287,24 @@ class HtmlMenuItem(BaseMenuItem):
     def render(self):
         return mark_safe(self.html)
 
+    def definition_key(self, strict=False):
+        return super().definition_key(strict) + [stable_value(self.html, strict)]
+
 
 class DividerItem(BaseMenuItem):
 
+    __slots__ = ()
     default_render = False
 
+    definition_key = BaseMenuItem.definition_key
+
     @staticmethod
     def render():
         return mark_safe('<div class="dropdown-divider"></div>')
 
 
 class HeaderItem(BaseMenuItem):
+    __slots__ = ('text',)
     default_render = False
 
     def __init__(self, text=None, **kwargs):
@@ -91,8 +314,13 @@ class HeaderItem(BaseMenuItem):
     def render(self):
         return mark_safe(f'<div class="dropdown-header">{self.text}</div>')
 
+    def definition_key(self, strict=False):
+        return super().definition_key(strict) + [stable_value(self.text, strict)]
+
 
 class MenuItemDisplay:
+    __slots__ = ('text', 'font_awesome', '_css_classes', 'tooltip', '_attributes', '__weakref__')
+
     def __init__(self, text=None, font_awesome=None, css_classes=None, tooltip=None, attributes=None):
         self._css_classes = None
 
@@ -129,11 +357,76 @@ class MenuItemDisplay:
             self._css_classes = css
 
     def attributes(self):
-        return MenuItem.attr(self._attributes, self.tooltip)
+        return MenuItem.attr(dict(self._attributes) if self._attributes else None, self.tooltip)
+
+    def copy(self):
+        attributes = dict(self._attributes) if isinstance(self._attributes, Mapping) else self._attributes
+        return MenuItemDisplay(self.text, self.font_awesome, list(self.css_classes), self.tooltip, attributes)
+
+
+class SharedMenuItemDisplay(MenuItemDisplay):
+    __slots__ = ()
+
+    def __init__(self, text=None, font_awesome=None, css_classes=(), tooltip=None, attributes=None):
+        if attributes is not None:
+            attributes = MappingProxyType(dict(attributes))
+        for name, value in (('text', text), ('font_awesome', font_awesome), ('_css_classes', css_classes),
+                            ('tooltip', tooltip), ('_attributes', attributes)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is shared between menu items, '
+                             f'assign a new menu_display instead')
+
+    def __reduce__(self):
+        if self.tooltip is None and self._attributes is None:
+            return interned_display, (self.text, self.font_awesome, list(self._css_classes))
+        return SharedMenuItemDisplay, (self.text, self.font_awesome, self._css_classes, self.tooltip,
+                                       None if self._attributes is None else dict(self._attributes))
+
+
+display_flyweights = weakref.WeakValueDictionary()
+empty_mapping = MappingProxyType({})
+
+
+def interned_display(text=None, font_awesome=None, css_classes=None):
+    if not (text is None or isinstance(text, str)) or not (font_awesome is None or isinstance(font_awesome, str)):
+        return MenuItemDisplay(text, font_awesome, css_classes)
+    if css_classes is None:
+        css = ()
+    elif isinstance(css_classes, str):
+        css = (css_classes,)
+    elif isinstance(css_classes, (list, tuple)):
+        css = tuple(css_classes)
+    else:
+        return MenuItemDisplay(text, font_awesome, css_classes)
+    if type(text) is str and font_awesome is None and not css:
+        key = text
+    else:
+        key = (type(text), text, font_awesome, css)
+    try:
+        display = display_flyweights.get(key)
+    except TypeError:
+        return MenuItemDisplay(text, font_awesome, css_classes)
+    if display is None:
+        display = display_flyweights.setdefault(key, SharedMenuItemDisplay(text, font_awesome, css))
+    return display
+
+
+def shared_display(display):
+    if isinstance(display, SharedMenuItemDisplay):
+        return display
+    return SharedMenuItemDisplay(display.text, display.font_awesome, tuple(display.css_classes), display.tooltip,
+                                 display._attributes or None)
 
 
 class MenuItem(BaseMenuItem):
 
+    __slots__ = ('query_string_params', '_resolved_url', '_href', '_menu_config', '_button_defaults_pending',
+                 'link_type', 'key', 'permission_name', '_url', '_url_args', '_url_kwargs', '_attributes',
+                 '_display_input', '_menu_display', '_font_awesome', '_css_classes', 'kwargs', 'template', 'target', 'show_caret',
+                 'dropdown', 'default_render')
+
     HREF = 0
     AJAX_GET_URL_NAME = 1
     URL_NAME = 2
@@ -145,16 +438,22 @@ class MenuItem(BaseMenuItem):
                              URL_NAME,
                              HREF]
 
+    def permission_source(self, request):
+        if self.link_type in self.RESOLVABLE_LINK_TYPES and self.resolved_url != 'invalid':
+            view_class = getattr(self.resolved_url.func, 'view_class', None)
+            if hasattr(view_class, 'view_permission'):
+                return view_class, 'view_permission'
+        elif request and request.resolver_match:
+            view_class = getattr(request.resolver_match.func, 'view_class', None)
+            if hasattr(view_class, 'menu_permissions'):
+                return view_class, 'menu_permissions'
+        return None, None
+
     def test_visible(self, request):
-        if self.visible:
-            if self.link_type in self.RESOLVABLE_LINK_TYPES and self.resolved_url != 'invalid':
-                view_class = getattr(self.resolved_url.func, 'view_class', None)
-                if hasattr(view_class, 'view_permission'):
-                    self.visible = view_class.view_permission(request, self)
-            elif request and request.resolver_match:
-                view_class = getattr(request.resolver_match.func, 'view_class', None)
-                if hasattr(view_class, 'menu_permissions'):
-                    self.visible = view_class.menu_permissions(request, self)
+        if self.visible and not self.permission_checked:
+            view_class, permission_method = self.permission_source(request)
+            if view_class is not None:
+                self.visible = getattr(view_class, permission_method)(request, self)
         return self.visible
 
     @property
@@ -164,15 +463,33 @@ class MenuItem(BaseMenuItem):
     @menu.setter
     def menu(self, menu):
         self._menu = menu
-        if menu.button_defaults and self.name in menu.button_defaults:
-            self.menu_display = menu.button_defaults[self.name]
-            if not isinstance(self.menu_display, MenuItemDisplay):
-                self.menu_display = MenuItemDisplay(self.menu_display)
+        self._button_defaults_pending = True
         if self.dropdown:
             self.dropdown.menu = menu
 
+    def apply_button_defaults(self):
+        button_defaults = self._menu.button_defaults
+        if button_defaults:
+            menu_display = button_defaults.get(self._menu_display.text)
+            if menu_display is not None:
+                self._menu_display = menu_display
+
+    def bind(self, menu):
+        item = super().bind(menu)
+        if item.dropdown:
+            item.dropdown = item.dropdown.bind(menu.request)
+            item.dropdown.menu = menu
+        return item
+
+    def freeze(self):
+        self.snapshot = None
+        self.snapshot = {'active': self.active, 'href': self.href(), 'css': self.css(), 'name': self.name,
+                         'attributes': self.attributes()}
+
     def css(self):
-        return ' '.join(self.menu_display.css_classes + (['disabled'] if self.disabled else []))
+        if self.snapshot is not None:
+            return self.snapshot['css']
+        return ' '.join(list(self.resolved_display().css_classes) + (['disabled'] if self.disabled else []))
 
     @staticmethod
     def attr(attributes, tooltip):
@@ -185,10 +502,13 @@ class MenuItem(BaseMenuItem):
                  badge=None, target=None, dropdown=None, show_caret=True, font_awesome=None, no_hover=False,
                  placement='bottom-start', url_args=None, url_kwargs=None, attributes=None,
                  dropdown_template='dropdown', dropdown_kwargs=None, tooltip=None, key=None, permission_name=None,
-                 query_string_params=None, **kwargs):
+                 query_string_params=None, eager=None, defer_dropdown=False, **kwargs):
         super().__init__(**kwargs, badge=badge)
         self.query_string_params = query_string_params
         self._resolved_url = None
+        self._href = None
+        self._menu_config = None
+        self._button_defaults_pending = False
         self.link_type = link_type
         self.key = key
         self.permission_name = permission_name if permission_name else url
@@ -197,26 +517,14 @@ class MenuItem(BaseMenuItem):
             if url_args is None and len(split_url) > 1:
                 url_args = split_url[1:]
                 url = split_url[0]
-        self._href = self.raw_href(url, url_args, url_kwargs, **kwargs)
-        self._attributes = self.attr(attributes, tooltip)
-        self.menu_config = {}
-        if url is not None and link_type in self.RESOLVABLE_LINK_TYPES and self.resolved_url != 'invalid':
-            view_class = getattr(self.resolved_url.func, 'view_class', None)
-            if menu_display is None:
-                if hasattr(view_class, 'menu_display'):
-                    menu_display = view_class.menu_display
-                else:
-                    menu_display = self.resolved_url.url_name.capitalize()
-            if hasattr(view_class, 'menu_config'):
-                if callable(view_class.menu_config):
-                    self.menu_config: dict = view_class.menu_config()
-                else:
-                    # noinspection PyTypeChecker
-                    self.menu_config: dict = view_class.menu_config
-        if isinstance(menu_display, MenuItemDisplay):
-            self.menu_display = menu_display
-        else:
-            self.menu_display = MenuItemDisplay(menu_display, font_awesome, css_classes)
+        self._url = url
+        self._url_args = url_args
+        self._url_kwargs = url_kwargs
+        self._attributes = self.attr(attributes, tooltip) if attributes or tooltip else empty_mapping
+        self._display_input = menu_display
+        self._menu_display = menu_display
+        self._font_awesome = font_awesome
+        self._css_classes = css_classes
         self.kwargs = kwargs
         self.template = template
         self.target = target
@@ -227,8 +535,12 @@ class MenuItem(BaseMenuItem):
             if dropdown_kwargs is None:
                 dropdown_kwargs = {}
             from .menu import HtmlMenu
-            self.dropdown = HtmlMenu(template=dropdown_template,
-                                     no_hover=no_hover, placement=placement, **dropdown_kwargs).add_items(*dropdown)
+            self.dropdown = HtmlMenu(template=dropdown_template, no_hover=no_hover, placement=placement,
+                                     **dropdown_kwargs)
+            if defer_dropdown:
+                self.dropdown.deferred_items = dropdown
+            else:
+                self.dropdown.add_items(*dropdown)
         else:
             self.dropdown = None
             self.show_caret = False
@@ -238,7 +550,91 @@ class MenuItem(BaseMenuItem):
         else:
             self.default_render = True
 
+        if eager is None:
+            eager = getattr(settings, 'DJANGO_MENUS_EAGER_URLS', False)
+        if eager:
+            self.prepare()
+
+    def prepare(self):
+        # noinspection PyStatementEffect
+        self.resolved_display(), self.menu_config
+        if self.dropdown:
+            self.dropdown.prepare()
+
+    def definition_key(self, strict=False):
+        check_definition(self, strict)
+        display = self._display_input
+        if isinstance(self._menu_display, MenuItemDisplay) and not isinstance(self._menu_display,
+                                                                              SharedMenuItemDisplay):
+            display = self._menu_display
+        if isinstance(display, MenuItemDisplay):
+            display = [display.text, display.font_awesome, display.css_classes, display.tooltip, display._attributes]
+        values = [self.link_type, self._url, self._url_args, self._url_kwargs, display, self._font_awesome,
+                  self._css_classes, self._attributes, self.query_string_params, self.template, self.target,
+                  self.show_caret, self.key, {k: v for k, v in self.kwargs.items() if k != 'menu'}]
+        return (BaseMenuItem.definition_key(self) + [stable_value(v, strict) for v in values] +
+                [self.dropdown.contents_key(strict) if self.dropdown else None])
+
+    def resolved_view_class(self):
+        if self._url is not None and self.link_type in self.RESOLVABLE_LINK_TYPES and self.resolved_url != 'invalid':
+            return getattr(self.resolved_url.func, 'view_class', None)
+
+    def resolved_display(self):
+        if not isinstance(self._menu_display, MenuItemDisplay):
+            menu_display = self._menu_display
+            if menu_display is None and self._url is not None and self.link_type in self.RESOLVABLE_LINK_TYPES \
+                    and self.resolved_url != 'invalid':
+                view_class = self.resolved_view_class()
+                if hasattr(view_class, 'menu_display'):
+                    menu_display = view_class.menu_display
+                else:
+                    menu_display = self.resolved_url.url_name.capitalize()
+            if isinstance(menu_display, MenuItemDisplay):
+                self._menu_display = menu_display
+            else:
+                self._menu_display = interned_display(menu_display, self._font_awesome, self._css_classes)
+        if self._button_defaults_pending:
+            self._button_defaults_pending = False
+            self.apply_button_defaults()
+        return self._menu_display
+
+    @property
+    def menu_display(self):
+        menu_display = self.resolved_display()
+        if isinstance(menu_display, SharedMenuItemDisplay):
+            menu_display = self._menu_display = menu_display.copy()
+        return menu_display
+
+    @menu_display.setter
+    def menu_display(self, menu_display):
+        self._display_input = menu_display
+        self._menu_display = menu_display
+
+    @property
+    def menu_config(self):
+        if self._menu_config is None:
+            self._menu_config = {}
+            view_class = self.resolved_view_class()
+            if hasattr(view_class, 'menu_config'):
+                if callable(view_class.menu_config):
+                    self._menu_config = view_class.menu_config()
+                else:
+                    self._menu_config = view_class.menu_config
+        return self._menu_config
+
+    @menu_config.setter
+    def menu_config(self, menu_config):
+        self._menu_config = menu_config
+
+    @property
+    def raw_url(self):
+        if self._href is None:
+            self._href = self.raw_href(self._url, self._url_args, self._url_kwargs, **self.kwargs)
+        return self._href
+
     def attributes(self):
+        if self.snapshot is not None:
+            return self.snapshot['attributes']
         attributes = {}
         if 'attributes' in self.menu_config:
             if type(self.menu_config['attributes']) == dict:
@@ -246,20 +642,22 @@ class MenuItem(BaseMenuItem):
             else:
                 attributes.update(self.external_function(self.menu_config['attributes']))
         attributes.update(self._attributes)
-        attributes.update(self.menu_display.attributes())
+        attributes.update(self.resolved_display().attributes())
         if attributes:
             return mark_safe(' '.join([f'{k}="{v}"' for k, v in attributes.items()]))
         return ''
 
     @property
     def name(self):
-        return self.menu_display.display()
+        if self.snapshot is not None:
+            return self.snapshot['name']
+        return self.resolved_display().display()
 
     @property
     def resolved_url(self):
         if self._resolved_url is None:
             try:
-                self._resolved_url = resolve(urlparse(self._href).path)
+                self._resolved_url = cached_resolve(urlparse(self.raw_url).path)
             except Resolver404:
                 self._resolved_url = 'invalid'
         return self._resolved_url
@@ -269,6 +667,8 @@ class MenuItem(BaseMenuItem):
 
     @property
     def active(self):
+        if self.snapshot is not None:
+            return self.snapshot['active']
         if self.menu:
             if self.menu.active and self.resolved_url != 'invalid':
                 try:
@@ -282,13 +682,18 @@ class MenuItem(BaseMenuItem):
             elif self.menu.request is not None:
                 if self.link_type in self.RESOLVABLE_LINK_TYPES:
                     if self.menu.compare_full_path:
-                        return self.menu.request.get_full_path() == self._href
+                        return self.menu.request.get_full_path() == self.raw_url
                     else:
-                        return self.menu.request.path == self._href
+                        return self.menu.request.path == self.raw_url
 
     def render(self):
         if self.template is None:
             self.template = 'django_menus/single_button.html'
+        if getattr(self.menu, 'native_render', False):
+            from .native import native_renderer
+            renderer = native_renderer(self.template)
+            if renderer:
+                return renderer(self)
         return render_to_string(self.template, dict(**{'menu_item': self}, **self.kwargs))
 
     @staticmethod
@@ -307,7 +712,7 @@ class MenuItem(BaseMenuItem):
         if not name_url:
             return 'javascript:void(0)'
         elif self.link_type in [self.URL_NAME, self.AJAX_GET_URL_NAME]:
-            url = reverse(name_url, args=url_args if url_args else [], kwargs=url_kwargs if url_kwargs else {})
+            url = cached_reverse(name_url, args=url_args, kwargs=url_kwargs)
             if self.query_string_params is not None:
                 if isinstance(self.query_string_params, dict):
                     url += '?' + urlencode(self.query_string_params)
@@ -333,9 +738,11 @@ class MenuItem(BaseMenuItem):
             return function_def[0](self, *function_def[1:])
 
     def href(self):
+        if self.snapshot is not None:
+            return self.snapshot['href']
         if self.disabled:
             return 'javascript:void(0)'
-        href = self._href
+        href = self.raw_url
         if 'href_format' in self.menu_config:
             if type(self.menu_config['href_format']) == str:
                 href = self.menu_config['href_format'].format(href)
@@ -350,6 +757,9 @@ class MenuItem(BaseMenuItem):
 
 class AjaxButtonMenuItem(MenuItem):
 
+    __slots__ = ()
+    definition_key = MenuItem.definition_key
+
     def __init__(self, button_name, menu_display=None, url_name=None, url_args=None, ajax_kwargs=None, **kwargs):
         ajax_kwargs = ajax_kwargs if ajax_kwargs else {}
         super().__init__(button_javascript(button_name, url_name, url_args, **ajax_kwargs).replace('"', "'"),
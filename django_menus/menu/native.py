@@ -0,0 +1,191 @@
+import os
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils.html import conditional_escape, strip_spaces_between_tags
+from django.utils.safestring import mark_safe
+
+template_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates')
+overridden = {}
+
+
+def is_overridden(template_name):
+    if template_name not in overridden:
+        try:
+            origin = get_template(template_name).origin.name
+        except TemplateDoesNotExist:
+            origin = None
+        overridden[template_name] = origin != os.path.join(template_dir, template_name)
+    return overridden[template_name]
+
+
+@receiver(setting_changed)
+def template_settings_changed(setting, **_kwargs):
+    if setting in ('TEMPLATES', 'INSTALLED_APPS'):
+        overridden.clear()
+
+
+def var(obj, *names):
+    for name in names:
+        obj = getattr(obj, name, '')
+        if callable(obj):
+            obj = obj()
+    return obj
+
+
+def out(value):
+    return conditional_escape(value if isinstance(value, str) else str(value))
+
+
+def spaceless(html):
+    return strip_spaces_between_tags(html.strip())
+
+
+def dropdown_id(value, html):
+    return html.format(out(var(value, 'dropdown', 'id'))) if var(value, 'dropdown') else ''
+
+
+def active(value):
+    return ' active' if var(value, 'active') else ''
+
+
+def caret(value, html):
+    return html if var(value, 'show_caret') else ''
+
+
+def items(menu, default_render, indent=8):
+    html = ''
+    for value in menu.visible_items():
+        html += '\n' + ' ' * indent
+        if var(value, 'default_render'):
+            html += default_render(value)
+        else:
+            html += f'\n{" " * (indent + 4)}{out(var(value, "render"))}\n{" " * indent}'
+        html += '\n' + ' ' * (indent - 4)
+    return html
+
+
+def main_menu_item(value):
+    li_id = dropdown_id(value, 'id="{}"')
+    span_class = caret(value, ' class="dropdown-toggle"') if var(value, 'dropdown') else ''
+    return (f'\n            <li {li_id} class="nav-item" style="position: relative" >\n'
+            f'                <a class="nav-link{active(value)} {out(var(value, "css"))}" '
+            f'href="{out(var(value, "href"))}">\n'
+            f'                    <span{span_class}>{out(var(value, "name"))}{out(var(value, "badge"))}</span>\n'
+            f'                </a>\n'
+            f'            </li>\n        ')
+
+
+def main_menu(menu):
+    alignment = 'ml-auto' if menu.alignment == 'right' else 'mr-auto'
+    html = f'\n<ul class="navbar-nav {alignment}">\n    {items(menu, main_menu_item)}\n</ul>\n'
+    return spaceless(html)
+
+
+def tab_menu_item(value):
+    li_id = dropdown_id(value, 'id="{}" ')
+    return (f'\n            <li {li_id}class="nav-item">\n'
+            f'                <a class="nav-link{active(value)}" href="{out(var(value, "href"))}" '
+            f'{out(var(value, "attributes"))}>{out(var(value, "name"))}{out(var(value, "badge"))}</a>\n'
+            f'            </li>\n        ')
+
+
+def tab_menu(menu):
+    return spaceless(f'\n<ul class="nav nav-tabs">\n    {items(menu, tab_menu_item)}\n</ul>\n') + '\n'
+
+
+def button(value, css_prefix, indent):
+    a_id = dropdown_id(value, 'id="{}"')
+    css = out(var(value, 'css') or 'btn-primary')
+    span_class = caret(value, 'class="dropdown-toggle"')
+    return (f'<a {a_id} href="{out(var(value, "href"))}"\n'
+            f'{" " * (indent + 3)}class="{css_prefix}btn {css}{active(value)}" {out(var(value, "attributes"))}>\n'
+            f'{" " * (indent + 4)}<span {span_class}>{out(var(value, "name"))}{out(var(value, "badge"))}</span></a>')
+
+
+def button_group(menu):
+    html = items(menu, lambda value: f'\n            {button(value, "", 12)}\n        ')
+    return spaceless(f'\n<div class="btn-group">\n    {html}\n</div>\n')
+
+
+def button_menu(menu):
+    html = items(menu, lambda value: f'\n            {button(value, "mr-1 mb-1 ", 12)}\n        ')
+    return spaceless(f'\n<div>\n    {html}\n</div>\n')
+
+
+def single_button(menu_item):
+    return button(menu_item, '', 0)
+
+
+def breadcrumb_item(value):
+    name = f'{out(var(value, "name"))}{out(var(value, "badge"))}'
+    if var(value, 'active'):
+        html = f'\n                        <li class="breadcrumb-item active" aria-current="page">{name}</li>\n'
+    else:
+        html = (f'\n                        <li class="breadcrumb-item">\n'
+                f'                            <a href="{out(var(value, "href"))}"\n'
+                f'                               class="{out(var(value, "css"))}" {out(var(value, "attributes"))}>'
+                f'{name}</a>\n'
+                f'                        </li>\n')
+    return f'\n                    {html}                    \n                '
+
+
+def breadcrumb(menu):
+    html = items(menu, breadcrumb_item, 16)
+    return spaceless(f'\n    <nav aria-label="breadcrumb">\n        <ol class="breadcrumb">\n            {html}\n'
+                     f'        </ol>\n    </nav>\n')
+
+
+def dropdown_item(value):
+    return (f'\n            <a  class="dropdown-item {out(var(value, "css"))}" href="{out(var(value, "href"))}" '
+            f'{out(var(value, "attributes"))}>{out(var(value, "name"))}</a>\n        ')
+
+
+def dropdown(menu):
+    menu_id = out(menu.id)
+    placement = out(menu.placement)
+    if menu.delegated:
+        mode = 'click' if menu.no_hover else 'hover'
+        attributes = f' data-menu-dropdown="{mode}" data-menu-placement="{placement}"'
+        script = '\n'
+    else:
+        attributes = ''
+        function = 'dropdown_menu_click' if menu.no_hover else 'dropdown_menu_function'
+        script = f"\n\n<script>\n    \n        {function}($('#{menu_id}'), '{placement}')\n    \n</script>\n\n"
+    html = (f"\n<div id='{menu_id}-menu' class=\"dropdown-menu\" role=\"menu\"{attributes}>\n"
+            f"    {items(menu, dropdown_item)}\n</div>\n{script}")
+    return spaceless(html) + '\n\n'
+
+
+def context_menu_item(value):
+    icon = caret(value, '<i class="fas fa-caret-right pt-1 float-right"></i>') if var(value, 'dropdown') else ''
+    return (f'\n            <a class="dropdown-item {out(var(value, "css"))}" id="{out(var(value, "dropdown", "id"))}" '
+            f'href="{out(var(value, "href"))}" {out(var(value, "attributes"))}>\n'
+            f'            {out(var(value, "name"))}{out(var(value, "badge"))}{icon}\n'
+            f'            </a>\n        ')
+
+
+def context_menu(menu):
+    html = (f"\n<div id='context-menu' class=\"dropdown-menu\" role=\"menu\">\n"
+            f"    {items(menu, context_menu_item)}\n</div>\n")
+    return spaceless(html) + '\n\n'
+
+
+renderers = {
+    'django_menus/main_menu.html': main_menu,
+    'django_menus/tab_menu.html': tab_menu,
+    'django_menus/button_group.html': button_group,
+    'django_menus/breadcrumb.html': breadcrumb,
+    'django_menus/dropdown.html': dropdown,
+    'django_menus/button_menu.html': button_menu,
+    'django_menus/context_menu.html': context_menu,
+    'django_menus/single_button.html': single_button,
+}
+
+
+def native_renderer(template_name):
+    renderer = renderers.get(template_name)
+    if renderer is not None and not is_overridden(template_name):
+        return lambda obj: mark_safe(renderer(obj))
@@ -0,0 +1,38 @@
+import itertools
+import re
+
+from django.utils.safestring import mark_safe
+
+
+class RowMenuTemplate:
+
+    def __init__(self, html, tokens, ids=()):
+        tokens = dict(tokens)
+        for c, menu_id in enumerate(ids):
+            tokens[menu_id] = ('id', c)
+        self.ids = list(ids)
+        self.parts = []
+        self.slots = []
+        self.rows = itertools.count()
+        position = 0
+        if tokens:
+            pattern = re.compile('|'.join(re.escape(t) for t in sorted(tokens, key=len, reverse=True)))
+            for match in pattern.finditer(html):
+                self.parts.append(html[position:match.start()])
+                self.slots.append(tokens[match.group(0)])
+                position = match.end()
+        self.parts.append(html[position:])
+
+    def fill(self, values):
+        pieces = [self.parts[0]]
+        for slot, part in zip(self.slots, self.parts[1:]):
+            pieces.append(values.get(slot, ''))
+            pieces.append(part)
+        return ''.join(pieces)
+
+    def render(self, **kwargs):
+        row = next(self.rows)
+        values = {k: str(v) for k, v in kwargs.items()}
+        for c, menu_id in enumerate(self.ids):
+            values[('id', c)] = f'{menu_id}r{row}'
+        return mark_safe(self.fill(values))
@@ -1,8 +1,14 @@
+import hashlib
 import json
 from collections import namedtuple
 
 from ajax_helpers.utils import ajax_command, is_ajax
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from django.utils.safestring import mark_safe
 
 from django_menus.menu import AjaxMenuTemplateView
@@ -20,38 +26,150 @@ class AjaxMenuTabs(AjaxMenuTemplateView):
     ]
 
     additional_content = []
+    incremental_tabs = True
+    tab_cache_max_age = None
+    tab_cache_control = 'No-Cache,No-Store'
+    stream_tabs = False  # WSGI only, ASGI requests get the normal response
 
     def create_ajax_commands(self, context):
-        self.add_command('clear_timers', store='tab')
+        commands = []
         for c in self.ajax_response_commands:
+            if self.fragment_unchanged(c.name):
+                continue
             if c.type == self.TEMPLATE_CONTENT:
                 html = context[c.name]
+                fingerprint = self.fingerprint(c.name, html)
             else:
-                html = self.menus[c.name].render()
+                menu = self.menus[c.name]
+                html = menu.render()
+                fingerprint = self.fingerprint(c.name, html, menu)
+            if fingerprint is None or self.client_fingerprints().get(c.name) != fingerprint:
+                commands.append((c, html, fingerprint))
+        if any(c.type == self.TEMPLATE_CONTENT for c, _html, _fingerprint in commands):
+            self.add_command('clear_timers', store='tab')
+        for c, html, fingerprint in commands:
             self.add_command('html', selector='#' + c.name, html=html)
+            if fingerprint is not None:
+                self.add_command('set_attr', selector='#' + c.name, attr='data-menu-fragment', val=fingerprint)
 
     def __init__(self, *args, **kwargs):
         self.ajax_response_commands = None
+        self._client_fingerprints = None
+        self.streaming = False
         super().__init__(*args, **kwargs)
 
+    def client_fingerprints(self):
+        if self._client_fingerprints is None:
+            self._client_fingerprints = {}
+            if self.incremental_tabs and is_ajax(self.request):
+                try:
+                    fingerprints = json.loads(self.request.META.get('HTTP_X_MENU_FRAGMENTS', '{}'))
+                except ValueError:
+                    fingerprints = None
+                if isinstance(fingerprints, dict):
+                    self._client_fingerprints = fingerprints
+        return self._client_fingerprints
+
+    def fragment_fingerprint(self, name):
+        return None
+
+    def fingerprint(self, name, html=None, menu=None):
+        if not self.incremental_tabs:
+            return None
+        fingerprint = self.fragment_fingerprint(name)
+        if fingerprint is not None:
+            namespace = f'{self.__class__.__module__}.{self.__class__.__qualname__}:{self.tab_template}'
+            return hashlib.md5(f'{namespace}:{self.request.path}:{name}:{fingerprint}'.encode()).hexdigest()[:10]
+        if html is None:
+            return None
+        html = str(html)
+        if menu is not None:
+            for menu_id in menu.rendered_ids(html):
+                html = html.replace(menu_id, '')
+        return hashlib.md5(html.encode()).hexdigest()[:10]
+
+    def fragment_unchanged(self, name):
+        fingerprint = self.fingerprint(name)
+        return fingerprint is not None and self.client_fingerprints().get(name) == fingerprint
+
     def set_response_commands(self):
         if not self.ajax_response_commands:
             self.ajax_response_commands = self._ajax_commands + [self.AjaxCommand(*a) for a in self.additional_content]
 
+    def tab_etag(self):
+        return None
+
+    def tab_last_modified(self):
+        return None
+
     def tab_response(self):
         self.set_response_commands()
-        context = self.get_context_data(**self.kwargs)
-        self.create_ajax_commands(context)
-        response = self.command_response()
-        response['Cache-Control'] = 'No-Cache,No-Store'
+        etag = self.tab_etag()
+        if etag is not None:
+            etag = quote_etag(str(etag))
+        last_modified = self.tab_last_modified()
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        response = get_conditional_response(self.request, etag, last_modified)
+        if response is None:
+            context = self.get_context_data(**self.kwargs)
+            self.create_ajax_commands(context)
+            response = self.command_response()
+            if etag is None and last_modified is None and 'no-store' not in self.tab_cache_control.lower():
+                etag = quote_etag(hashlib.md5(response.content).hexdigest())
+                response = get_conditional_response(self.request, etag, None, response)
+        response['Cache-Control'] = self.tab_cache_control
+        if etag is not None:
+            response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['X-Requested-With', 'X-Menu-Fragments'])
+        max_age = self.get_tab_cache_max_age()
+        if max_age:
+            response['X-Menu-Tab-Max-Age'] = max_age
         return response
 
+    def get_tab_cache_max_age(self):
+        return self.tab_cache_max_age
+
+    def get_page_commands(self):
+        commands = super().get_page_commands()
+        if self.tab_cache_max_age:
+            commands.append(ajax_command('tab_cache', size=getattr(settings, 'DJANGO_MENUS_TAB_CACHE_SIZE', 20)))
+        return commands
+
     def get(self, request, *args, **kwargs):
         self.set_response_commands()
         if is_ajax(request):
             return self.tab_response()
+        if self.stream_tabs and not isinstance(request, ASGIRequest):
+            return self.stream_response()
         return super().get(request, *args, **kwargs)
 
+    def stream_response(self):
+        self.streaming = True
+        context = self.get_context_data(**self.kwargs)
+        context['menu_stream_fragments'] = [c.name for c in self.ajax_response_commands]
+        html = render_to_string(self.get_template_names(), context, self.request)
+        return StreamingHttpResponse(self.stream_fragments(context, html))
+
+    def stream_fragments(self, context, html):
+        split = html.lower().rfind('</body>')
+        if split < 0:
+            split = len(html)
+        yield html[:split]
+        for c in self.ajax_response_commands:
+            if c.type == self.TEMPLATE_CONTENT:
+                fragment = render_to_string(getattr(self, c.name), context=context)
+                fingerprint = self.fingerprint(c.name, fragment)
+            else:
+                menu = self.menus[c.name]
+                fragment = menu.render()
+                fingerprint = self.fingerprint(c.name, fragment, menu)
+            yield (f'<template data-menu-stream="{c.name}">{fragment}</template>'
+                   f'<script>menu_stream_fill("{c.name}", {json.dumps(fingerprint)})</script>')
+        yield html[split:]
+
     def main_context(self, **kwargs):
         return {}
 
@@ -74,6 +192,6 @@ class AjaxMenuTabs(AjaxMenuTemplateView):
             context.update(self.main_context())
         context.update(self.tab_context())
         for c in self.ajax_response_commands:
-            if c.type == self.TEMPLATE_CONTENT:
+            if c.type == self.TEMPLATE_CONTENT and not self.streaming and not self.fragment_unchanged(c.name):
                 context[c.name] = mark_safe(render_to_string(getattr(self, c.name), context=context))
         return context
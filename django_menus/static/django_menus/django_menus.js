@@ -79,6 +79,54 @@ var dropdown_menu_click = function dropdown_menu_click(reference) {
 }
 
 
+function delegated_dropdown(element) {
+    for (; element && element !== document; element = element.parentNode) {
+        if (element.id && !element.hasAttribute('data-menu-dropdown-init')) {
+            var menu = document.getElementById(element.id + '-menu');
+            if (menu && menu.hasAttribute('data-menu-dropdown')) {
+                return {reference: element, menu: menu};
+            }
+        }
+    }
+}
+
+$(document).on('mouseover focusin click', function (e) {
+    var dropdown = delegated_dropdown(e.target);
+    if (dropdown === undefined) {
+        return;
+    }
+    var reference = $(dropdown.reference);
+    var placement = dropdown.menu.getAttribute('data-menu-placement');
+    dropdown.reference.setAttribute('data-menu-dropdown-init', '');
+    if (dropdown.menu.getAttribute('data-menu-dropdown') === 'click') {
+        dropdown_menu_click(reference, placement);
+    } else {
+        dropdown_menu_function(reference, placement);
+        if (e.type === 'mouseover') {
+            reference.triggerHandler('mouseenter');
+        }
+    }
+    if (e.type === 'click') {
+        reference.triggerHandler('click');
+    }
+    var deferred = dropdown.menu.getAttribute('data-menu-deferred');
+    if (deferred !== null) {
+        dropdown.menu.removeAttribute('data-menu-deferred');
+        ajax_helpers.post_json({
+            url: dropdown.menu.getAttribute('data-menu-url') || undefined,
+            data: {ajax: 'deferred_dropdown', path: deferred, menu_id: dropdown.reference.id}
+        });
+    }
+});
+
+ajax_helpers.command_functions.deferred_dropdown = function (command) {
+    var menu = $('#' + command.menu_id + '-menu');
+    var nodes = $($.parseHTML(command.html, document, true));
+    var loaded = nodes.filter('#' + command.menu_id + '-menu');
+    menu.html(loaded.html());
+    menu.after(nodes.not(loaded));
+};
+
 function click_href(href) {
     var a = document.createElement('a');
     a.style.display = 'none';
@@ -89,6 +137,221 @@ function click_href(href) {
 }
 
 
+var row_menu_templates = {};
+var row_menu_count = 0;
+
+function row_menu_html(template_id, data) {
+    if (row_menu_templates[template_id] === undefined) {
+        row_menu_templates[template_id] = JSON.parse(document.getElementById(template_id).textContent).html;
+    }
+    var html = row_menu_templates[template_id].split('{row}').join('r' + row_menu_count++);
+    html = html.split('{pk}').join(data.pk === undefined ? '' : data.pk);
+    return html.split('{slug}').join(data.slug === undefined ? '' : data.slug);
+}
+
+function instantiate_row_menus(container) {
+    $(container).find('[data-row-menu]').each(function () {
+        var placeholder = $(this);
+        var html = row_menu_html(this.dataset.rowMenu, this.dataset);
+        placeholder.removeAttr('data-row-menu');
+        placeholder.html(html);
+    });
+}
+
+$(document).on('mouseover focusin', 'tr, .row-menu-container', function () {
+    instantiate_row_menus(this);
+});
+
+
+$.ajaxPrefilter(function (options) {
+    if (options.type.toUpperCase() !== 'POST' || typeof options.data !== 'string' || options.crossDomain) {
+        return;
+    }
+    try {
+        var data = JSON.parse(options.data);
+    } catch (e) {
+        return;
+    }
+    if (!data || data.timer !== 'menu') {
+        return;
+    }
+    if (data.badge_ids === undefined) {
+        data.badge_ids = $('[data-menu-badge]').map(function () {
+            return this.id;
+        }).get();
+    }
+    if (data.badge_token === undefined && menu_badge_token) {
+        data.badge_token = menu_badge_token;
+    }
+    options.data = JSON.stringify(data);
+    options.menu_badges = true;
+});
+
+$(document).ajaxSend(function (event, xhr, settings) {
+    if (settings.menu_badges) {
+        var hashes = {};
+        $('[data-menu-badge]').each(function () {
+            hashes[this.id] = $(this).find('[data-menu-badge-hash]').attr('data-menu-badge-hash') || '';
+        });
+        xhr.setRequestHeader('X-Menu-Badges', JSON.stringify(hashes));
+    } else if (menu_fragment_request && !settings.crossDomain) {
+        var fragments = {};
+        $('[data-menu-fragment]').each(function () {
+            fragments[this.id] = this.getAttribute('data-menu-fragment');
+        });
+        if (!$.isEmptyObject(fragments)) {
+            xhr.setRequestHeader('X-Menu-Fragments', JSON.stringify(fragments));
+        }
+    }
+});
+
+
+function menu_stream_fill(name, fingerprint) {
+    var template = $('template[data-menu-stream="' + name + '"]');
+    var target = $('#' + name);
+    target.html(template.html());
+    if (fingerprint) {
+        target.attr('data-menu-fragment', fingerprint);
+    }
+    template.remove();
+}
+
+
+var menu_keys = {elements: [], lookup: {}, is_mac: false};
+
+try {
+    var platform = navigator?.userAgentData?.platform || navigator?.platform || 'unknown';
+    menu_keys.is_mac = platform.toLowerCase().indexOf('mac') > -1;
+} catch (err) {}
+
+function menu_key_lookup() {
+    var elements = document.getElementsByClassName('menu-keys');
+    var changed = elements.length !== menu_keys.elements.length;
+    for (var i = 0; !changed && i < elements.length; i++) {
+        changed = elements[i] !== menu_keys.elements[i];
+    }
+    if (changed) {
+        menu_keys.elements = Array.prototype.slice.call(elements);
+        menu_keys.lookup = {};
+        menu_keys.elements.forEach(function (element) {
+            var key_dict = JSON.parse(element.textContent);
+            for (var key in key_dict) {
+                menu_keys.lookup[[key, key_dict[key].shift, key_dict[key].alt]] = key_dict[key].href;
+            }
+        });
+    }
+    return menu_keys.lookup;
+}
+
+$(document).on('keydown', function (e) {
+    if (typeof django_modal !== 'undefined' && django_modal.active_modal_container_id() !== "modal-0") {
+        return;
+    }
+    var lookup = menu_key_lookup();
+    var href = lookup[[e.key, e.shiftKey, menu_keys.is_mac ? e.ctrlKey : e.altKey]];
+    if (href !== undefined) {
+        e.preventDefault();
+        click_href(href);
+    }
+});
+
+
+var menu_tab_cache = {enabled: false, size: 20, entries: new Map(), pending: {}};
+
+ajax_helpers.command_functions.tab_cache = function (command) {
+    menu_tab_cache.enabled = true;
+    menu_tab_cache.size = command.size;
+    $(document).on('mouseenter focusin', 'a[href^="javascript: ajax_helpers.get_content("]', function () {
+        var url = tab_cache_url(this);
+        if (url && !tab_cache_get(url)) {
+            tab_cache_fetch(url);
+        }
+    });
+};
+
+function tab_cache_url(link) {
+    var match = link.getAttribute('href').match(/get_content\('([^']*)'\)/);
+    return match ? match[1] : null;
+}
+
+function tab_cache_get(url) {
+    var entry = menu_tab_cache.entries.get(url);
+    if (entry === undefined) {
+        return null;
+    }
+    menu_tab_cache.entries.delete(url);
+    if (entry.expires < Date.now()) {
+        return null;
+    }
+    menu_tab_cache.entries.set(url, entry);
+    return entry.commands;
+}
+
+function tab_cache_fetch(url) {
+    if (menu_tab_cache.pending[url] === undefined) {
+        menu_tab_cache.pending[url] = $.ajax({url: url, menu_tab_cache: true}).done(function (data, status, xhr) {
+            var max_age = parseInt(xhr.getResponseHeader('X-Menu-Tab-Max-Age'));
+            if (max_age > 0 && typeof data === 'object') {
+                menu_tab_cache.entries.set(url, {commands: data, expires: Date.now() + max_age * 1000});
+                while (menu_tab_cache.entries.size > menu_tab_cache.size) {
+                    menu_tab_cache.entries.delete(menu_tab_cache.entries.keys().next().value);
+                }
+            }
+        }).always(function () {
+            delete menu_tab_cache.pending[url];
+        });
+    }
+    return menu_tab_cache.pending[url];
+}
+
+var ajax_get_content = ajax_helpers.get_content;
+var menu_fragment_request = false;
+
+ajax_helpers.get_content = function (url, store) {
+    if (!menu_tab_cache.enabled) {
+        menu_fragment_request = true;
+        try {
+            return ajax_get_content(url, store);
+        } finally {
+            menu_fragment_request = false;
+        }
+    }
+    try {$('[data-toggle="tooltip"], .tooltip').tooltip("hide")} catch {}
+    if (store !== false) {
+        history.pushState(null, "", url);
+    }
+    var process = function (commands) {
+        if (typeof commands === 'object') {
+            ajax_helpers.process_commands(JSON.parse(JSON.stringify(commands)));
+        }
+    };
+    var commands = tab_cache_get(url);
+    if (commands) {
+        process(commands);
+    } else {
+        tab_cache_fetch(url).done(process);
+    }
+};
+
+
+var menu_badge_token = null;
+
+ajax_helpers.command_functions.menu_badge_ids = function (command) {
+    menu_badge_token = command.token;
+};
+
+
+ajax_helpers.command_functions.badge_stream = function (command) {
+    if (typeof EventSource === 'undefined') {
+        return;
+    }
+    var source = new EventSource(command.url + '?' + $.param({token: command.token}));
+    source.onmessage = function (e) {
+        ajax_helpers.process_commands(JSON.parse(e.data));
+    };
+};
+
+
 ajax_helpers.command_functions.enable_context_menu = function (command) {
     $(document).on("contextmenu", command.selector, function (evt) {
         evt.preventDefault();
@@ -1,4 +1,6 @@
+from ajax_helpers.utils import random_string
 from django import template
+from django.utils.html import format_html, json_script
 from django.utils.safestring import mark_safe
 from django_menus.menu import MenuItem
 from django_menus import DUMMY_MENU_ID, DUMMY_MENU_SLUG
@@ -6,14 +8,27 @@ from django_menus import DUMMY_MENU_ID, DUMMY_MENU_SLUG
 register = template.Library()
 
 
+def fragment_attribute(context, content_name, html, menu=None):
+    view = context.get('view')
+    fingerprint = view.fingerprint(content_name, html, menu) if hasattr(view, 'fingerprint') else None
+    return f' data-menu-fragment="{fingerprint}"' if fingerprint else ''
+
+
 @register.simple_tag(takes_context=True)
 def template_content(context, content_name):
-    return mark_safe(f'<div id={content_name}>{context[content_name]}</div>')
+    if content_name in context.get('menu_stream_fragments', ()):
+        return mark_safe(f'<div id={content_name}></div>')
+    html = context[content_name]
+    return mark_safe(f'<div id={content_name}{fragment_attribute(context, content_name, html)}>{html}</div>')
 
 
 @register.simple_tag(takes_context=True)
 def menu_content(context, content_name):
-    return mark_safe(f'<div id={content_name}>{context["menus"][content_name].render()}</div>')
+    if content_name in context.get('menu_stream_fragments', ()):
+        return mark_safe(f'<div id={content_name}></div>')
+    menu = context['menus'][content_name]
+    html = menu.render()
+    return mark_safe(f'<div id={content_name}{fragment_attribute(context, content_name, html, menu)}>{html}</div>')
 
 
 @register.simple_tag()
@@ -23,7 +38,12 @@ def display_button(**kwargs):
 
 @register.simple_tag
 def show_menu(menu, **kwargs):
+    if menu.compile_rows:
+        return menu.render_row(**kwargs)
     html = menu.render()
+    if menu.deterministic_id:
+        for menu_id in menu.rendered_ids(html):
+            html = html.replace(menu_id, f'{menu_id}r{random_string()}')
     for key, value in kwargs.items():
         if key == 'pk':
             html = html.replace(str(DUMMY_MENU_ID), str(value))
@@ -32,3 +52,13 @@ def show_menu(menu, **kwargs):
         else:
             html = html.replace(str(key), str(value))
     return mark_safe(html)
+
+
+@register.simple_tag
+def row_menu_template(menu):
+    return json_script({'html': menu.client_row_template()}, menu.row_menu_id())
+
+
+@register.simple_tag
+def row_menu(menu, pk='', slug=''):
+    return format_html('<span data-row-menu="{}" data-pk="{}" data-slug="{}"></span>', menu.row_menu_id(), pk, slug)